@@ -1,13 +1,98 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.core.exceptions import ValidationError
 
 from .models import Post, Group, Comment, Follow
+from .moderation import delete_author_posts, move_posts
+from .pagination import EstimatedCountPaginator
+from .search import search
+
+
+class UsernameFilter(admin.SimpleListFilter):
+    """Фильтр по имени пользователя полем ввода, без списка всех."""
+    template = 'admin/posts/username_filter.html'
+    field = None
+
+    def lookups(self, request, model_admin):
+        # Пустой список скрыл бы фильтр.
+        return (('', ''),)
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(
+                **{f'{self.field}__username': self.value()})
+        return queryset
+
+    def choices(self, changelist):
+        yield {
+            'parameter_name': self.parameter_name,
+            'value': self.value() or '',
+            'params': [(name, value)
+                       for name, value in changelist.params.items()
+                       if name not in (self.parameter_name, 'p')],
+        }
+
+
+def username_filter(field, title):
+    return type(f'{field.title()}Filter', (UsernameFilter,), {
+        'field': field,
+        'title': title,
+        'parameter_name': f'{field}__username',
+    })
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+
+
+class PostActionForm(ActionForm):
+    group = forms.ModelChoiceField(
+        queryset=Group.objects.all(),
+        required=False,
+        label='Группа',
+        empty_label='без группы',
+    )
 
 
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(LargeTableAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
-    list_filter = ('pub_date',)
-    empty_value_display = '-пусто-'
+    list_filter = (username_filter('author', 'автор'), 'pub_date')
+    autocomplete_fields = ('author', 'group')
+    action_form = PostActionForm
+    actions = ('delete_author_posts', 'move_to_group')
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        found = search(search_term).values('pk')
+        return queryset.filter(pk__in=found), False
+
+    def delete_author_posts(self, request, queryset):
+        authors = queryset.order_by().values_list(
+            'author_id', flat=True).distinct()
+        deleted = delete_author_posts(authors)
+        self.message_user(request, f'Удалено записей: {deleted}')
+    delete_author_posts.short_description = (
+        'Удалить все записи авторов выбранных записей')
+    delete_author_posts.allowed_permissions = ('delete',)
+
+    def move_to_group(self, request, queryset):
+        field = PostActionForm.base_fields['group']
+        try:
+            group = field.clean(request.POST.get('group'))
+        except ValidationError:
+            self.message_user(request, 'Группа не найдена',
+                              level=messages.ERROR)
+            return
+        moved = move_posts(queryset, group)
+        self.message_user(request, f'Перенесено записей: {moved}')
+    move_to_group.short_description = 'Перенести в выбранную группу'
+    move_to_group.allowed_permissions = ('change',)
 
 
 admin.site.register(Post, PostAdmin)
@@ -23,21 +108,25 @@ class GroupAdmin(admin.ModelAdmin):
 admin.site.register(Group, GroupAdmin)
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     list_display = ('pk', 'post', 'author', 'text', 'created')
-    search_fields = ('author',)
-    list_filter = ('created',)
-    empty_value_display = '-пусто-'
+    list_select_related = ('post', 'author')
+    search_fields = ('=author__username',)
+    list_filter = (username_filter('author', 'автор'), 'created')
+    autocomplete_fields = ('post', 'author')
+    raw_id_fields = ('parent',)
 
 
 admin.site.register(Comment, CommentAdmin)
 
 
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(LargeTableAdmin):
     list_display = ('pk', 'user', 'author')
-    search_fields = ('user',)
-    list_filter = ('user',)
-    empty_value_display = '-пусто-'
+    list_select_related = ('user', 'author')
+    search_fields = ('=user__username', '=author__username')
+    list_filter = (username_filter('user', 'подписчик'),
+                   username_filter('author', 'автор'))
+    autocomplete_fields = ('user', 'author')
 
 
 admin.site.register(Follow, FollowAdmin)
@@ -0,0 +1,186 @@
+"""JSON API только для чтения: /api/v1/.
+
+Повторяет index, group_posts, profile, post_view и follow_index. Ленты
+отдаются keyset-страницами (?cursor=), комментарии к записи — тоже
+(?comments=), ответы помечены ETag и
+Last-Modified, так что неизменившаяся лента возвращает 304.
+"""
+from functools import wraps
+
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+
+from .cache import (POSTS_SCOPE, author_scope, follow_scope, group_scope,
+                    post_scope)
+from .conditional import (author_pk, conditional, feed_newest, group_pk,
+                          newest, scopes_etag)
+from .feed import FeedPaginator
+from .models import Comment, Group, Post, User
+from .pagination import CursorPaginator, InvalidCursor
+from . import constants as c
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status,
+                        json_dumps_params={'ensure_ascii': False})
+
+
+def serialize_author(user):
+    return {
+        'username': user.username,
+        'name': user.get_full_name(),
+    }
+
+
+def serialize_group(group):
+    return {
+        'slug': group.slug,
+        'title': group.title,
+    }
+
+
+def serialize_post(post):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date.isoformat(),
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'image': post.image.url if post.image else None,
+        'comments_count': post.comments_count,
+        'url': reverse('api:post', args=(post.author.username, post.pk)),
+    }
+
+
+def serialize_comment(comment):
+    return {
+        'id': comment.pk,
+        'author': comment.author.username,
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+        'parent': comment.parent_id,
+        'depth': comment.depth,
+        'replies_count': comment.replies_count,
+    }
+
+
+def serialize_stats(user):
+    stats = getattr(user, 'stats', None)
+    return {
+        'posts_count': stats.posts_count if stats else 0,
+        'followers_count': stats.followers_count if stats else 0,
+        'following_count': stats.following_count if stats else 0,
+    }
+
+
+def page_response(request, queryset, paginator=None, **extra):
+    paginator = paginator or CursorPaginator(
+        queryset.prefetch_related(None), c.PGR)
+    try:
+        page = paginator.page(request.GET.get('cursor') or None)
+    except InvalidCursor:
+        return json_response({'detail': 'Неверный курсор'}, status=400)
+
+    def link(cursor):
+        if cursor is None:
+            return None
+        return f'{request.path}?cursor={cursor}'
+
+    return json_response({
+        **extra,
+        'results': [serialize_post(post) for post in page],
+        'next': link(page.next_cursor),
+        'previous': link(page.previous_cursor),
+    })
+
+
+def authenticated(view):
+    @wraps(view)
+    def inner(request, *args, **kwargs):
+        if request.user.is_authenticated:
+            response = view(request, *args, **kwargs)
+        else:
+            response = json_response({'detail': 'Требуется авторизация'},
+                                     status=401)
+        patch_vary_headers(response, ('Cookie',))
+        return response
+    return inner
+
+
+@conditional(
+    lambda request: scopes_etag(request, POSTS_SCOPE),
+    lambda request: newest(Post.objects.all(), Comment.objects.all()),
+)
+def index(request):
+    return page_response(request, Post.objects.for_listing())
+
+
+@conditional(
+    lambda request, slug: scopes_etag(request, group_scope(group_pk(slug))),
+    lambda request, slug: newest(
+        Post.objects.filter(group__slug=slug),
+        Comment.objects.filter(post__group__slug=slug)),
+)
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return page_response(
+        request, Post.objects.for_listing().filter(group=group),
+        group=serialize_group(group),
+    )
+
+
+@conditional(
+    lambda request, username: scopes_etag(
+        request, author_scope(author_pk(username))),
+    lambda request, username: newest(
+        Post.objects.filter(author__username=username),
+        Comment.objects.filter(post__author__username=username)),
+)
+def profile(request, username):
+    author = get_object_or_404(User.objects.select_related('stats'),
+                               username=username)
+    return page_response(
+        request, author.posts.for_listing(),
+        author={**serialize_author(author), **serialize_stats(author)},
+    )
+
+
+@conditional(
+    lambda request, username, post_id: scopes_etag(
+        request, post_scope(post_id)),
+    lambda request, username, post_id: newest(
+        Post.objects.filter(pk=post_id),
+        Comment.objects.filter(post_id=post_id)),
+)
+def post_view(request, username, post_id):
+    post = get_object_or_404(Post.objects.select_related('author', 'group'),
+                             pk=post_id, author__username=username)
+    comments = Comment.objects.filter(post=post).select_related('author')
+    paginator = CursorPaginator(comments, c.COMMENTS_PER_PAGE,
+                                ordering=('path',))
+    try:
+        page = paginator.page(request.GET.get('comments') or None)
+    except InvalidCursor:
+        return json_response({'detail': 'Неверный курсор'}, status=400)
+    next_comments = None
+    if page.next_cursor is not None:
+        next_comments = f'{request.path}?comments={page.next_cursor}'
+    return json_response({
+        **serialize_post(post),
+        'comments': [serialize_comment(comment) for comment in page],
+        'next_comments': next_comments,
+    })
+
+
+@authenticated
+@conditional(
+    lambda request: scopes_etag(
+        request, POSTS_SCOPE, follow_scope(request.user.pk),
+        variant=str(request.user.pk)),
+    lambda request: feed_newest(request.user),
+)
+def follow_index(request):
+    return page_response(request, None,
+                         paginator=FeedPaginator(request.user))
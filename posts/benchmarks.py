@@ -0,0 +1,117 @@
+"""Замеры страниц ленты: запросы к базе, задержка и выделенная память.
+
+Используется командой ``bench_views``. Каждая страница прогоняется через
+тестовый клиент Django дважды: сначала без инструментирования для
+задержки, затем с подсчётом запросов и tracemalloc. Результат сравнивается
+с сохранённым базовым прогоном: рост числа запросов — всегда регрессия,
+задержка (p95) и память — если выросли больше порога. Пропускную
+способность живого сервера под параллельной нагрузкой меряет ``load_test``.
+"""
+import itertools
+import math
+import statistics
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from yatube.querywrappers import wrap_queries
+
+
+def percentile(values, fraction):
+    """Перцентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+
+def measure(request, repeat, memory_repeat, before=None):
+    """Метрики одной страницы; request() выполняет запрос и отдаёт ответ."""
+    latencies = []
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        started = time.perf_counter()
+        response = request()
+        latencies.append(time.perf_counter() - started)
+    queries = []
+    allocated = []
+    tracemalloc.start()
+    try:
+        for _ in range(memory_repeat):
+            if before is not None:
+                before()
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            counter = itertools.count()
+
+            def count(execute, sql, params, many, context):
+                next(counter)
+                return execute(sql, params, many, context)
+
+            with wrap_queries(count):
+                response = request()
+            queries.append(next(counter))
+            allocated.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+    return {
+        'status': response.status_code,
+        'queries': max(queries) if queries else None,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'memory_kb': (round(statistics.median(allocated) / 1024, 1)
+                      if allocated else None),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Список регрессий относительно базового прогона."""
+    regressions = []
+    for name, current in results['views'].items():
+        previous = baseline.get('views', {}).get(name)
+        if previous is None:
+            continue
+        if (current['queries'] is not None
+                and previous.get('queries') is not None
+                and current['queries'] > previous['queries']):
+            regressions.append(
+                f"{name}: запросов {current['queries']} "
+                f"(было {previous['queries']})")
+        for metric in ('p95_ms', 'memory_kb'):
+            if current.get(metric) is None or not previous.get(metric):
+                continue
+            limit = previous[metric] * (1 + threshold)
+            if current[metric] > limit:
+                regressions.append(
+                    f'{name}: {metric} {current[metric]} '
+                    f'(было {previous[metric]}, порог {limit:.1f})')
+    return regressions
+
+
+def load(fetch, urls, concurrency, total):
+    """Пропускная способность при concurrency одновременных клиентах.
+
+    fetch(url) выполняет запрос и отдаёт код ответа (None при ошибке
+    соединения); адреса перебираются по кругу.
+    """
+    def request(number):
+        started = time.perf_counter()
+        status = fetch(urls[number % len(urls)])
+        return status, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(request, range(total)))
+    elapsed = time.perf_counter() - started
+    latencies = [latency for _, latency in results]
+    return {
+        'requests': total,
+        'concurrency': concurrency,
+        'errors': sum(1 for status, _ in results
+                      if status is None or status >= 400),
+        'rps': round(total / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+    }
@@ -0,0 +1,131 @@
+"""Версионированный кеш страниц ленты.
+
+У каждой области данных (вся лента, группа, автор, запись, подписки
+пользователя) есть номер версии в кеше. Сигналы записи Post, Comment,
+Follow и Group увеличивают версии затронутых областей, а ключ фрагмента
+страницы строится из этих версий, параметров страницы и вида зрителя.
+Устаревшие фрагменты никто не читает, TTL нужен только для уборки.
+
+Всё хранится в отдельном алиасе кеша ``posts`` (см. CACHES в настройках):
+у него свой префикс ключей и номер версии схемы, так что общий для
+воркеров бэкенд можно делить с другими приложениями.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+
+from . import replicas
+from . import constants as c
+
+VERSION_PREFIX = 'posts:version:'
+POSTS_SCOPE = 'posts'
+HOT_SCOPE = 'hot'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def author_scope(user_id):
+    return f'author:{user_id}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def follow_scope(user_id):
+    return f'follow:{user_id}'
+
+
+def post_scopes(post):
+    group_ids = {post.group_id, getattr(post, '_loaded_group_id', None)}
+    return [
+        POSTS_SCOPE,
+        author_scope(post.author_id),
+        post_scope(post.pk),
+        *(group_scope(group_id) for group_id in group_ids
+          if group_id is not None),
+    ]
+
+
+def _initial_version():
+    # После вытеснения ключа версия не должна вернуться к старому номеру,
+    # иначе снова станут видны фрагменты, собранные до вытеснения.
+    return time.time_ns()
+
+
+def get_cache():
+    return caches[c.CACHE_ALIAS]
+
+
+def fragment_cached(fragment, page_cache_key):
+    """Есть ли фрагмент {% cache ... fragment page_cache_key %}."""
+    key = make_template_fragment_key(fragment, [page_cache_key])
+    return get_cache().get(key) is not None
+
+
+def _bump(scopes):
+    cache = get_cache()
+    for scope in scopes:
+        key = VERSION_PREFIX + scope
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), None)
+
+
+def bump(*scopes):
+    # Повторное увеличение после коммита закрывает гонку: параллельный
+    # запрос мог успеть закешировать старые данные под новой версией.
+    scopes = set(scopes)
+    _bump(scopes)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(scopes))
+
+
+def versions(*scopes):
+    cache = get_cache()
+    keys = [VERSION_PREFIX + scope for scope in scopes]
+    found = cache.get_many(keys)
+    missing = {key: _initial_version() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def viewer(request):
+    user = request.user
+    if not user.is_authenticated:
+        return 'anon'
+    stats = getattr(user, 'stats', None)
+    if stats is not None and stats.posts_count:
+        return f'user:{user.pk}'
+    return 'auth'
+
+
+def page_cache(request, *scopes):
+    """Ключ и время жизни фрагмента для тега ``{% cache %}``."""
+    parts = [
+        request.path,
+        request.GET.get('page', ''),
+        request.GET.get('cursor', ''),
+        request.GET.get('comments', ''),
+        viewer(request),
+        *scopes,
+        *map(str, versions(*scopes)),
+        replicas.replica_mark(),
+    ]
+    key = hashlib.md5('|'.join(parts).encode()).hexdigest()
+    timeout = c.PAGE_CACHE_TIMEOUT
+    if replicas.current() is not None:
+        timeout = settings.REPLICA_CACHE_SECONDS
+    return {
+        'page_cache_key': key,
+        'page_cache_timeout': timeout,
+    }
@@ -0,0 +1,57 @@
+"""Параллельное чтение независимых запросов страницы.
+
+Django 2.2 не умеет асинхронные представления и ASGI, поэтому независимые
+запросы post_view (автор, запись и страница комментариев) выполняются в
+пуле потоков: у каждого потока своё соединение с базой. У списков (profile,
+follow_index и других) параллелить нечего: страница читается одним
+запросом по ключу без COUNT(*). Режим включается настройкой
+CONCURRENT_READS (YATUBE_CONCURRENT_READS=1) и по умолчанию выключен:
+в тестах данные TestCase не видны из других соединений.
+"""
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from yatube.querywrappers import installed_wrappers
+
+from . import constants as c
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=c.CONCURRENT_READ_WORKERS,
+            thread_name_prefix='reads',
+        )
+    return _executor
+
+
+def _call(func):
+    close_old_connections()
+    try:
+        # Счётчики запросов метрик и профилирования — и в этом потоке.
+        with installed_wrappers():
+            return func()
+    finally:
+        close_old_connections()
+
+
+def enabled():
+    return settings.CONCURRENT_READS
+
+
+def gather(*funcs):
+    """Результаты funcs по порядку; в режиме CONCURRENT_READS параллельно."""
+    if not enabled() or len(funcs) < 2:
+        return [func() for func in funcs]
+    # Контекст (например, выбранная реплика) переходит в потоки пула.
+    futures = [
+        _get_executor().submit(contextvars.copy_context().run, _call, func)
+        for func in funcs
+    ]
+    return [future.result() for future in futures]
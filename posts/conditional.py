@@ -0,0 +1,159 @@
+"""Условные GET-запросы (ETag, Last-Modified, 304).
+
+ETag строится из версий областей кеша (см. posts.cache): сигналы меняют
+их при любой записи, поэтому проверка стоит одного чтения из кеша и не
+трогает базу. Last-Modified считается агрегатом по индексам и только
+тогда, когда клиент не прислал If-None-Match: по RFC 7232 тот важнее,
+а удаление комментария или правку текста видно лишь по ETag.
+
+HTML-страницы дополнительно получают Vary: Cookie и Cache-Control:
+анонимные ответы публичные (их может держать обратный прокси), ответы
+авторизованным пользователям — только в их браузере. ETag и общий кеш
+ответов с реплики живут не дольше REPLICA_CACHE_SECONDS
+(см. posts.replicas.replica_mark).
+"""
+import hashlib
+from calendar import timegm
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import DateTimeField, Max, Subquery
+from django.shortcuts import get_object_or_404
+from django.utils.cache import (get_conditional_response,
+                                patch_cache_control, patch_vary_headers)
+from django.utils.http import http_date, quote_etag
+
+from .feed import feed_for
+from .models import Comment, Group, User
+from . import cache, replicas
+from . import constants as c
+
+
+def scopes_etag(request, *scopes, variant=''):
+    parts = [
+        request.get_full_path(),
+        variant,
+        *scopes,
+        *map(str, cache.versions(*scopes)),
+    ]
+    return quote_etag(hashlib.md5('|'.join(parts).encode()).hexdigest())
+
+
+def latest(*values):
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+def newest(posts, comments):
+    """Дата последней записи или комментария одним запросом."""
+    last_comment = comments.order_by('-created').values('created')[:1]
+    dates = posts.order_by().aggregate(
+        post=Max('pub_date'),
+        comment=Max(Subquery(last_comment, output_field=DateTimeField())),
+    )
+    return latest(dates['post'], dates['comment'])
+
+
+def feed_newest(user):
+    feed = feed_for(user)
+    return newest(feed, Comment.objects.filter(post__in=feed))
+
+
+def author_pk(username):
+    return get_object_or_404(User.objects.values_list('pk', flat=True),
+                             username=username)
+
+
+def group_pk(slug):
+    return get_object_or_404(Group.objects.values_list('pk', flat=True),
+                             slug=slug)
+
+
+def conditional(etag_func, last_modified_func=None):
+    """Как django.views.decorators.http.condition, но Last-Modified
+    вычисляется лениво."""
+    def decorator(view):
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            etag = etag_func(request, *args, **kwargs)
+            last_modified = None
+
+            def get_last_modified():
+                if last_modified_func is None:
+                    return None
+                value = last_modified_func(request, *args, **kwargs)
+                return timegm(value.utctimetuple()) if value else None
+
+            if 'HTTP_IF_NONE_MATCH' not in request.META:
+                last_modified = get_last_modified()
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified)
+            if response is not None:
+                return response
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            if etag and not response.has_header('ETag'):
+                response['ETag'] = etag
+            if last_modified is None:
+                last_modified = get_last_modified()
+            if last_modified and not response.has_header('Last-Modified'):
+                response['Last-Modified'] = http_date(last_modified)
+            return response
+        return inner
+    return decorator
+
+
+def viewer_variant(request):
+    # Шапка страницы показывает имя пользователя, а формы — CSRF-токен,
+    # который меняется при каждом входе.
+    if request.user.is_authenticated:
+        token = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+        digest = hashlib.md5(token.encode()).hexdigest()[:8]
+        return f'user:{request.user.pk}:{digest}'
+    return 'anon'
+
+
+def cache_headers(view):
+    @wraps(view)
+    def inner(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if response.status_code not in (200, 304):
+            return response
+        patch_vary_headers(response, ('Cookie',))
+        if request.user.is_authenticated:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            shared_max_age = c.HTML_SHARED_MAX_AGE
+            if replicas.current() is not None:
+                shared_max_age = min(shared_max_age,
+                                     int(settings.REPLICA_CACHE_SECONDS))
+            patch_cache_control(response, public=True, max_age=0,
+                                s_maxage=shared_max_age)
+        return response
+    return inner
+
+
+def page_validators(scopes_func, last_modified_func=None):
+    """Условный GET и заголовки кеширования для HTML-страницы.
+
+    scopes_func возвращает области кеша, из которых собрана страница.
+    """
+    def etag(request, *args, **kwargs):
+        return scopes_etag(request, *scopes_func(request, *args, **kwargs),
+                           variant=f'{viewer_variant(request)}|'
+                                   f'{replicas.replica_mark()}')
+
+    def last_modified(request, *args, **kwargs):
+        # Дата не отражает смену CSRF-токена, поэтому авторизованным —
+        # только ETag.
+        if request.user.is_authenticated:
+            return None
+        return last_modified_func(request, *args, **kwargs)
+
+    def decorator(view):
+        return cache_headers(conditional(
+            etag, last_modified_func and last_modified)(view))
+    return decorator
@@ -1 +1,36 @@
 PGR = 10
+COMMENTS_PER_PAGE = 20
+LEGACY_PAGE_LIMIT = 10
+COMMENT_PATH_STEP = 10
+COMMENT_MAX_DEPTH = 20
+FEED_FANOUT_LIMIT = 10000
+FEED_LIGHT_LIMIT = 9000
+FEED_BACKFILL_SIZE = 1000
+FEED_BATCH_SIZE = 500
+APPROXIMATE_COUNT_TIMEOUT = 300
+COUNT_SCAN_LIMIT = 10000
+BULK_BATCH_SIZE = 500
+PAGE_CACHE_TIMEOUT = 60 * 60
+CACHE_ALIAS = 'posts'
+CONCURRENT_READ_WORKERS = 4
+WRITE_BATCH_SIZE = 200
+WRITE_BATCH_INTERVAL = 0.05
+WRITE_RETRY_LIMIT = 3
+THUMBNAIL_SIZES = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+IMAGE_VARIANT_WIDTHS = (320, 640, 960)
+IMAGE_VARIANT_RATIO = (960, 339)
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_VARIANT_SIZES = '(max-width: 960px) 100vw, 960px'
+SEARCH_TERM_MAX_LENGTH = 64
+HTML_SHARED_MAX_AGE = 10
+EXPORT_CHUNK_SIZE = 500
+EXPORT_FILE_CHUNK_SIZE = 64 * 1024
+HOT_HALF_LIFE = 12 * 60 * 60
+HOT_POST_WEIGHT = 1.0
+HOT_FOLLOWER_WEIGHT = 0.5
+HOT_COMMENT_WEIGHT = 1.0
+HOT_MIN_SCORE = 0.01
+# За 20 периодов полураспада вес падает в миллион раз.
+HOT_REBUILD_HALF_LIVES = 20
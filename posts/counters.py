@@ -0,0 +1,85 @@
+"""Денормализованные счётчики для карточки автора и списка записей.
+
+Счётчики меняются из сигналов сохранения и удаления Post, Comment и
+Follow в той же транзакции, что и сама запись. Команда ``recount``
+пересчитывает их целиком, если они разошлись с данными.
+"""
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Post, User, UserStats
+from . import constants as c
+
+
+def ensure_stats(user_ids):
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=user_id) for user_id in user_ids],
+        batch_size=c.BULK_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def adjust_user(user_id, **deltas):
+    if user_id is None:
+        return
+    changes = {field: Greatest(F(field) + delta, 0)
+               for field, delta in deltas.items()}
+    updated = UserStats.objects.filter(pk=user_id).update(**changes)
+    if not updated and all(delta > 0 for delta in deltas.values()):
+        ensure_stats([user_id])
+        UserStats.objects.filter(pk=user_id).update(**changes)
+
+
+def adjust_post(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=Greatest(F('comments_count') + delta, 0),
+    )
+
+
+def adjust_replies(comment_id, delta):
+    if comment_id is None:
+        return
+    Comment.objects.filter(pk=comment_id).update(
+        replies_count=Greatest(F('replies_count') + delta, 0),
+    )
+
+
+def _count(queryset, field):
+    counted = (
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counted), Value(0))
+
+
+def recount_users(user_ids=None):
+    users = User.objects.all()
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    ensure_stats(users.values_list('pk', flat=True))
+    stats = UserStats.objects.all()
+    if user_ids is not None:
+        stats = stats.filter(pk__in=user_ids)
+    return stats.update(
+        posts_count=_count(Post.objects.all(), 'author'),
+        followers_count=_count(Follow.objects.all(), 'author'),
+        following_count=_count(Follow.objects.all(), 'user'),
+    )
+
+
+def recount_posts(post_ids=None):
+    posts = Post.objects.all()
+    if post_ids is not None:
+        posts = posts.filter(pk__in=post_ids)
+    return posts.update(comments_count=_count(Comment.objects.all(), 'post'))
+
+
+def recount_comments(comment_ids=None):
+    comments = Comment.objects.all()
+    if comment_ids is not None:
+        comments = comments.filter(pk__in=comment_ids)
+    return comments.update(
+        replies_count=_count(Comment.objects.all(), 'parent'))
@@ -0,0 +1,88 @@
+"""Потоковая выгрузка данных пользователя (записи, комментарии, подписки).
+
+Строки читаются из базы через .iterator(chunk_size=...), картинки — из
+хранилища кусками, а ZIP пишется в поток без перемотки (zipfile сам
+переходит на дескрипторы данных), так что память не зависит от размера
+архива. Формат NDJSON отдаёт те же строки без файлов картинок.
+"""
+import io
+import json
+import zipfile
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Follow, Post
+from . import constants as c
+
+
+def _line(kind, row):
+    return (json.dumps({'type': kind, **row}, cls=DjangoJSONEncoder,
+                       ensure_ascii=False) + '\n').encode()
+
+
+def posts(user):
+    return (Post.objects.filter(author=user).order_by('pk')
+            .values('id', 'text', 'pub_date', 'group__slug', 'image'))
+
+
+def rows(user):
+    """Пары (тип, строка) всех данных пользователя."""
+    for row in posts(user).iterator(chunk_size=c.EXPORT_CHUNK_SIZE):
+        yield 'post', row
+    comments = (Comment.objects.filter(author=user).order_by('pk')
+                .values('id', 'post_id', 'parent_id', 'text', 'created'))
+    for row in comments.iterator(chunk_size=c.EXPORT_CHUNK_SIZE):
+        yield 'comment', row
+    following = (Follow.objects.filter(user=user).order_by('pk')
+                 .values('author__username'))
+    for row in following.iterator(chunk_size=c.EXPORT_CHUNK_SIZE):
+        yield 'following', row
+    followers = (Follow.objects.filter(author=user).order_by('pk')
+                 .values('user__username'))
+    for row in followers.iterator(chunk_size=c.EXPORT_CHUNK_SIZE):
+        yield 'follower', row
+
+
+def ndjson(user):
+    for kind, row in rows(user):
+        yield _line(kind, row)
+
+
+class _Sink(io.RawIOBase):
+    """Неперематываемый файл: записанное забирает генератор ответа."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+
+def archive(user, storage):
+    """ZIP с data.ndjson и оригиналами картинок в images/."""
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as zip_:
+        with zip_.open('data.ndjson', 'w', force_zip64=True) as entry:
+            for kind, row in rows(user):
+                entry.write(_line(kind, row))
+                yield from sink.drain()
+        images = posts(user).exclude(image='').exclude(image=None)
+        names = images.values_list('image', flat=True)
+        for name in names.iterator(chunk_size=c.EXPORT_CHUNK_SIZE):
+            if not storage.exists(name):
+                continue
+            with storage.open(name) as source, \
+                    zip_.open(f'images/{name}', 'w',
+                              force_zip64=True) as entry:
+                for chunk in source.chunks(c.EXPORT_FILE_CHUNK_SIZE):
+                    entry.write(chunk)
+                    yield from sink.drain()
+    yield from sink.drain()
@@ -0,0 +1,177 @@
+"""Материализованная лента подписок (fan-out on write).
+
+При публикации запись раскладывается в ленты всех подписчиков автора.
+Для авторов с очень большим числом подписчиков раскладка не выполняется:
+их записи подтягиваются в ленту при чтении (hybrid pull). Режим хранится
+в UserStats.feed_pull: он включается, как только подписчиков становится
+больше FEED_FANOUT_LIMIT, а выключает его только команда
+``backfill_feed --light-authors``, когда подписчиков не больше
+FEED_LIGHT_LIMIT. Она раскладывает подписчикам последнюю страницу записей
+автора пачками, каждая в своей транзакции. Разрыв между порогами не даёт
+колебаниям около границы запускать раскладку снова и снова, а пока режим
+не выключен, записи по-прежнему читаются при открытии ленты.
+
+Страница ленты (FeedPaginator) — срез FeedEntry по индексу
+(user, -pub_date, -post) и, если есть популярные авторы, срез их записей
+по индексу (author, -pub_date, -id); ключи сливаются в Python, а записи
+читаются по первичному ключу.
+"""
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .models import FeedEntry, Follow, Post, UserStats
+from .pagination import IndexPaginator
+from . import constants as c
+
+
+def is_heavy(author_id):
+    return UserStats.objects.filter(pk=author_id, feed_pull=True).exists()
+
+
+def mark_heavy(author_ids=None):
+    """Перевести в hybrid pull авторов (по умолчанию всех), у которых
+    подписчиков за порогом."""
+    stats = UserStats.objects.filter(
+        feed_pull=False, followers_count__gt=c.FEED_FANOUT_LIMIT)
+    if author_ids is not None:
+        stats = stats.filter(pk__in=author_ids)
+    stats.update(feed_pull=True)
+
+
+def heavy_authors_for(user):
+    return list(
+        Follow.objects.filter(
+            user=user, author__stats__feed_pull=True,
+        ).values_list('author_id', flat=True)
+    )
+
+
+def _bulk_insert(entries):
+    FeedEntry.objects.bulk_create(
+        entries, batch_size=c.FEED_BATCH_SIZE, ignore_conflicts=True,
+    )
+
+
+def fan_out_post(post):
+    if is_heavy(post.author_id):
+        return
+    follower_ids = (
+        Follow.objects.filter(author_id=post.author_id)
+        .values_list('user_id', flat=True)
+        .iterator(chunk_size=c.FEED_BATCH_SIZE)
+    )
+    _bulk_insert(
+        FeedEntry(user_id=user_id, post_id=post.pk,
+                  author_id=post.author_id, pub_date=post.pub_date)
+        for user_id in follower_ids
+    )
+
+
+def add_author_to_feed(user_id, author_id, limit=c.FEED_BACKFILL_SIZE):
+    if is_heavy(author_id):
+        return
+    posts = (
+        Post.objects.filter(author_id=author_id)
+        .values_list('pk', 'pub_date')[:limit]
+    )
+    _bulk_insert(
+        FeedEntry(user_id=user_id, post_id=pk,
+                  author_id=author_id, pub_date=pub_date)
+        for pk, pub_date in posts
+    )
+
+
+def _push_to_followers(author_id, posts):
+    """Разложить posts (пары pk, pub_date) подписчикам автора пачками,
+    каждая в своей транзакции."""
+    if not posts:
+        return
+    follower_ids = (
+        Follow.objects.filter(author_id=author_id)
+        .values_list('user_id', flat=True)
+        .iterator(chunk_size=c.FEED_BATCH_SIZE)
+    )
+    for chunk in iter(lambda: list(islice(follower_ids,
+                                          c.FEED_BATCH_SIZE)), []):
+        with transaction.atomic():
+            _bulk_insert(
+                FeedEntry(user_id=user_id, post_id=pk,
+                          author_id=author_id, pub_date=pub_date)
+                for user_id in chunk for pk, pub_date in posts
+            )
+
+
+def _latest_posts(author_id, limit, since=None):
+    posts = Post.objects.filter(author_id=author_id)
+    if since is not None:
+        posts = posts.filter(pub_date__gt=since)
+    return list(posts.values_list('pk', 'pub_date')[:limit])
+
+
+def add_followers_to_feed(author_id, limit=c.FEED_BACKFILL_SIZE):
+    """Раскладывает последние записи автора всем его подписчикам."""
+    if is_heavy(author_id):
+        return
+    _push_to_followers(author_id, _latest_posts(author_id, limit))
+
+
+def restore_light_authors(limit=c.PGR):
+    """Вернуть к раскладке авторов, у которых подписчиков не больше
+    FEED_LIGHT_LIMIT; возвращает их число.
+
+    Подписчикам раскладывается limit последних записей (страница ленты).
+    Режим выключается после раскладки, а записи, опубликованные за это
+    время, раскладываются следом.
+    """
+    authors = UserStats.objects.filter(
+        feed_pull=True, followers_count__lte=c.FEED_LIGHT_LIMIT,
+    ).values_list('pk', flat=True)
+    restored = 0
+    for author_id in list(authors):
+        posts = _latest_posts(author_id, limit)
+        _push_to_followers(author_id, posts)
+        switched = UserStats.objects.filter(
+            pk=author_id, feed_pull=True,
+            followers_count__lte=c.FEED_LIGHT_LIMIT,
+        ).update(feed_pull=False)
+        if not switched:
+            continue
+        since = posts[0][1] if posts else None
+        _push_to_followers(author_id,
+                           _latest_posts(author_id, limit, since))
+        restored += 1
+    return restored
+
+
+def remove_author_from_feed(user_id, author_id):
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def feed_for(user):
+    pushed = FeedEntry.objects.filter(user=user).values('post_id')
+    heavy = heavy_authors_for(user)
+    if not heavy:
+        return Post.objects.filter(pk__in=pushed)
+    return Post.objects.filter(Q(pk__in=pushed) | Q(author_id__in=heavy))
+
+
+class FeedPaginator(IndexPaginator):
+    """Keyset-страницы ленты подписок без JOIN Follow и Post."""
+
+    def __init__(self, user, per_page=c.PGR):
+        super().__init__(Post.objects.for_listing(), per_page)
+        self.user = user
+
+    @cached_property
+    def sources(self):
+        entries = FeedEntry.objects.filter(user=self.user)
+        heavy = heavy_authors_for(self.user)
+        if not heavy:
+            return [(entries, ('pub_date', 'post_id'))]
+        return [
+            (entries.exclude(author_id__in=heavy), ('pub_date', 'post_id')),
+            (Post.objects.filter(author_id__in=heavy), ('pub_date', 'id')),
+        ]
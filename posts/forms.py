@@ -1,6 +1,6 @@
 from django import forms
 
-from .models import Post, Comment
+from .models import Comment, Group, Post
 
 
 class PostForm(forms.ModelForm):
@@ -13,3 +13,23 @@ class CommentForm(forms.ModelForm):
     class Meta:
         model = Comment
         fields = ['text']
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(
+        label='Запрос',
+        max_length=200,
+        required=False,
+    )
+    group = forms.ModelChoiceField(
+        queryset=Group.objects.all(),
+        to_field_name='slug',
+        label='Группа',
+        empty_label='Все группы',
+        required=False,
+    )
+    author = forms.CharField(
+        label='Автор',
+        max_length=150,
+        required=False,
+    )
@@ -0,0 +1,139 @@
+"""Горячие записи: оценка с экспоненциальным затуханием во времени.
+
+Оценка записи — сумма весов событий, каждый из которых затухает вдвое за
+HOT_HALF_LIFE: публикация весит HOT_POST_WEIGHT плюс HOT_FOLLOWER_WEIGHT ×
+ln(1 + подписчиков автора), каждый комментарий — HOT_COMMENT_WEIGHT.
+Поэтому частые свежие комментарии поднимают запись, а старые записи
+опускаются сами.
+
+Оценки лежат в PostScore и меняются при вставке записи и комментария.
+Порядок строится по rank = ln(score) + DECAY × updated: у всех записей
+оценка со временем умножается на одно и то же число, так что rank не
+зависит от момента чтения, и страница /hot/ — keyset-чтение индекса
+(rank, post_id) без COUNT(*) и OFFSET.
+Команда ``decay_scores`` периодически пересчитывает score на текущий
+момент (rank при этом не меняется) и удаляет остывшие записи.
+"""
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import F, Value
+from django.db.models.functions import Exp
+from django.utils import timezone
+
+from .models import Comment, Post, PostScore, UserStats
+from .pagination import IndexPaginator
+from . import cache
+from . import constants as c
+
+DECAY = math.log(2) / c.HOT_HALF_LIFE
+
+
+class HotPaginator(IndexPaginator):
+    """Keyset-страницы /hot/ по ключу (rank, post_id).
+
+    Ключи читаются из индекса PostScore, а записи — по первичному ключу:
+    с JOIN к автору и группе SQLite сортирует всю выборку вместо чтения
+    индекса.
+    """
+    def __init__(self, per_page=c.PGR):
+        super().__init__(Post.objects.for_listing(), per_page,
+                         ordering=('-rank', '-post'))
+        self.sources = [(PostScore.objects.all(), ('rank', 'post_id'))]
+
+    @property
+    def key_model(self):
+        return PostScore
+
+
+def rank_of(score, at):
+    return math.log(score) + DECAY * at.timestamp()
+
+
+def decayed(score, since, at):
+    return score * math.exp(-DECAY * (at - since).total_seconds())
+
+
+def post_weight(followers):
+    return c.HOT_POST_WEIGHT + c.HOT_FOLLOWER_WEIGHT * math.log1p(
+        followers or 0)
+
+
+def _score(post, score, at):
+    return PostScore(post_id=post, score=score, rank=rank_of(score, at),
+                     updated=at)
+
+
+def add_post(post):
+    followers = (UserStats.objects.filter(pk=post.author_id)
+                 .values_list('followers_count', flat=True).first())
+    weight = post_weight(followers)
+    _score(post.pk, weight, post.pub_date).save(force_insert=True)
+
+
+def add_comments(counts, at=None):
+    """Учесть новые комментарии: counts — {id записи: сколько}."""
+    at = at or timezone.now()
+    scores = PostScore.objects.select_for_update().in_bulk(list(counts))
+    for score in scores.values():
+        score.score = (decayed(score.score, score.updated, at)
+                       + counts[score.pk] * c.HOT_COMMENT_WEIGHT)
+        score.rank = rank_of(score.score, at)
+        score.updated = at
+    PostScore.objects.bulk_update(scores.values(),
+                                  ['score', 'rank', 'updated'],
+                                  batch_size=c.BULK_BATCH_SIZE)
+    # Записи, остывшие до удаления или созданные до появления таблицы.
+    missing = Post.objects.filter(
+        pk__in=[post_id for post_id in counts if post_id not in scores],
+    ).values_list('pk', 'pub_date', 'author__stats__followers_count')
+    PostScore.objects.bulk_create(
+        [_score(post_id,
+                decayed(post_weight(followers), pub_date, at)
+                + counts[post_id] * c.HOT_COMMENT_WEIGHT, at)
+         for post_id, pub_date, followers in missing],
+        batch_size=c.BULK_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def decay(at=None):
+    """Пересчитать оценки на момент at и удалить остывшие.
+
+    Возвращает (пересчитано, удалено).
+    """
+    at = at or timezone.now()
+    now = DECAY * at.timestamp()
+    deleted, _ = PostScore.objects.filter(
+        rank__lt=math.log(c.HOT_MIN_SCORE) + now).delete()
+    updated = PostScore.objects.update(
+        score=Exp(F('rank') - Value(now)), updated=at)
+    if deleted:
+        cache.bump(cache.HOT_SCOPE)
+    return updated, deleted
+
+
+def rebuild(at=None):
+    """Оценки заново по записям и комментариям за последние дни."""
+    at = at or timezone.now()
+    window = at - timedelta(
+        seconds=c.HOT_HALF_LIFE * c.HOT_REBUILD_HALF_LIVES)
+    scores = defaultdict(float)
+    posts = Post.objects.filter(pub_date__gte=window).values_list(
+        'pk', 'pub_date', 'author__stats__followers_count')
+    for post_id, pub_date, followers in posts.iterator(
+            chunk_size=c.BULK_BATCH_SIZE):
+        scores[post_id] += decayed(post_weight(followers), pub_date, at)
+    comments = Comment.objects.filter(created__gte=window).values_list(
+        'post_id', 'created')
+    for post_id, created in comments.iterator(chunk_size=c.BULK_BATCH_SIZE):
+        scores[post_id] += decayed(c.HOT_COMMENT_WEIGHT, created, at)
+    PostScore.objects.all().delete()
+    created = PostScore.objects.bulk_create(
+        [_score(post_id, score, at) for post_id, score in scores.items()
+         if score >= c.HOT_MIN_SCORE],
+        batch_size=c.BULK_BATCH_SIZE,
+    )
+    cache.bump(cache.HOT_SCOPE)
+    return len(created)
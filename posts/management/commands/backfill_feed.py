@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.feed import add_author_to_feed, restore_light_authors
+from posts.models import FeedEntry, Follow
+from posts import constants as c
+
+
+class Command(BaseCommand):
+    help = 'Заполняет материализованные ленты подписок по существующим Follow'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Удалить существующие записи лент перед заполнением',
+        )
+        parser.add_argument(
+            '--limit', type=int, default=c.FEED_BACKFILL_SIZE,
+            help='Сколько последних записей автора добавить в ленту',
+        )
+        parser.add_argument(
+            '--light-authors', action='store_true',
+            help='Только вернуть к раскладке авторов, у которых подписчиков '
+                 'стало не больше FEED_LIGHT_LIMIT (страница записей; '
+                 'запускать периодически)',
+        )
+
+    def handle(self, *args, **options):
+        if options['light_authors']:
+            restored = restore_light_authors()
+            self.stdout.write(f'Возвращено к раскладке авторов: {restored}')
+            return
+        if options['clear']:
+            FeedEntry.objects.all().delete()
+        edges = (
+            Follow.objects.exclude(user=None).exclude(author=None)
+            .values_list('user_id', 'author_id')
+            .iterator(chunk_size=c.FEED_BATCH_SIZE)
+        )
+        total = 0
+        for user_id, author_id in edges:
+            with transaction.atomic():
+                add_author_to_feed(user_id, author_id, options['limit'])
+            total += 1
+        self.stdout.write(f'Обработано подписок: {total}')
@@ -0,0 +1,44 @@
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+
+from posts import cache, variants
+from posts.models import ImageVariant, Post
+from posts import constants as c
+
+
+class Command(BaseCommand):
+    help = 'Готовит адаптивные варианты для уже загруженных картинок записей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересоздать варианты и для записей, где они уже есть',
+        )
+
+    def handle(self, *args, **options):
+        posts = (
+            Post.objects.exclude(image='').exclude(image=None)
+            .only('pk', 'image', 'author_id', 'group_id')
+            .order_by('pk')
+        )
+        if not options['force']:
+            posts = posts.annotate(ready=Exists(ImageVariant.objects.filter(
+                post=OuterRef('pk'), source=OuterRef('image'),
+            ))).filter(ready=False)
+        done = skipped = 0
+        for post in posts.iterator(chunk_size=c.FEED_BATCH_SIZE):
+            try:
+                exists = post.image.storage.exists(post.image.name)
+            except SuspiciousFileOperation:
+                exists = False
+            if not exists:
+                self.stderr.write(f'Нет файла {post.image.name} '
+                                  f'(запись {post.pk})')
+                skipped += 1
+                continue
+            variants.generate(post)
+            cache.bump(*cache.post_scopes(post))
+            done += 1
+        self.stdout.write(
+            f'Подготовлено записей: {done}, пропущено: {skipped}')
@@ -0,0 +1,135 @@
+import json
+import platform
+from io import StringIO
+
+import django
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+
+from posts import cache
+from posts.benchmarks import compare, measure
+from posts.models import Group, Post, User
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Замеряет число запросов, задержку (p50/p95/p99) и память '
+            'страниц ленты; изменения в базе откатываются')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--memory-repeat', type=int, default=5)
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--comments', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--existing', action='store_true',
+            help='Не засевать данные, мерить на текущей базе',
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кеш страниц перед каждым запросом',
+        )
+        parser.add_argument('--output', help='Куда записать результат JSON')
+        parser.add_argument('--baseline', help='JSON базового прогона')
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Допустимый рост p95 и памяти относительно базового',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                if not options['existing']:
+                    self.seed(options)
+                results = self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+        output = json.dumps(results, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file_:
+                file_.write(output + '\n')
+        else:
+            self.stdout.write(output)
+        if options['baseline']:
+            with open(options['baseline']) as file_:
+                baseline = json.load(file_)
+            regressions = compare(results, baseline, options['threshold'])
+            if regressions:
+                raise CommandError('Регрессия производительности:\n'
+                                   + '\n'.join(regressions))
+            self.stderr.write('Регрессий нет')
+
+    def seed(self, options):
+        call_command(
+            'seed', prefix='bench', seed=options['seed'],
+            users=options['users'], posts=options['posts'],
+            comments=options['comments'],
+            groups=max(1, options['users'] // 50),
+            stdout=StringIO(),
+        )
+
+    def sample(self):
+        author = (User.objects.annotate(total=Count('posts'))
+                  .filter(total__gt=0).order_by('-stats__followers_count',
+                                                'pk').first())
+        reader = (User.objects.filter(follower__author=author)
+                  .order_by('-stats__following_count', 'pk').first())
+        group = (Group.objects.annotate(total=Count('group'))
+                 .order_by('-total', 'pk').first())
+        if author is None or reader is None or group is None:
+            raise CommandError('Мало данных: нужны автор с записями, его '
+                               'подписчик и группа')
+        post = author.posts.order_by('-pub_date', '-id').first()
+        return author, reader, group, post
+
+    def run(self, options):
+        author, reader, group, post = self.sample()
+        guest = Client()
+        user = Client()
+        user.force_login(reader)
+        post_url = reverse('post', args=(author.username, post.pk))
+        views = {
+            'index': lambda: guest.get(reverse('index')),
+            'group_posts': lambda: guest.get(
+                reverse('group', args=(group.slug,))),
+            'profile': lambda: guest.get(
+                reverse('profile', args=(author.username,))),
+            'post_view': lambda: guest.get(post_url),
+            'follow_index': lambda: user.get(reverse('follow_index')),
+            'add_comment': lambda: user.post(
+                reverse('add_comment', args=(author.username, post.pk)),
+                {'text': 'Комментарий для замера'}),
+            'new_post': lambda: user.post(
+                reverse('new_post'), {'text': 'Запись для замера'}),
+        }
+        before = cache.get_cache().clear if options['cold'] else None
+        results = {}
+        for name, request in views.items():
+            results[name] = measure(request, options['repeat'],
+                                    options['memory_repeat'], before)
+            self.stderr.write(
+                f"{name}: {results[name]['queries']} запросов, "
+                f"p95 {results[name]['p95_ms']} мс")
+        return {
+            'meta': {
+                'repeat': options['repeat'],
+                'cold': options['cold'],
+                'dataset': {
+                    'posts': Post.objects.count(),
+                    'users': User.objects.count(),
+                },
+                'python': platform.python_version(),
+                'django': django.get_version(),
+            },
+            'views': results,
+        }
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import hot
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает оценки горячих записей на текущий момент и '
+            'удаляет остывшие (запускать периодически, например из cron)')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Заново посчитать оценки по записям и комментариям',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['rebuild']:
+                total = hot.rebuild()
+                self.stdout.write(f'Посчитано записей: {total}')
+                return
+            updated, deleted = hot.decay()
+        self.stdout.write(f'Пересчитано: {updated}, удалено: {deleted}')
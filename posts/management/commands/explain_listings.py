@@ -0,0 +1,114 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from posts.models import Comment, Group, Post, PostScore, User
+from posts import hot
+from posts import constants as c
+
+LISTING_INDEXES = (
+    'posts_post_date_idx',
+    'posts_post_group_date_idx',
+    'posts_post_author_date_idx',
+    'posts_comment_post_idx',
+    'posts_score_rank_idx',
+)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Показывает планы и время горячих запросов ленты с индексами '
+            'и без них на синтетических данных (изменения откатываются)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--authors', type=int, default=200)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда рассчитана на SQLite '
+                               '(EXPLAIN QUERY PLAN)')
+        self.repeat = options['repeat']
+        try:
+            with transaction.atomic():
+                sample = self.seed(options)
+                self.report('С индексами', sample)
+                with connection.cursor() as cursor:
+                    for name in LISTING_INDEXES:
+                        cursor.execute(f'DROP INDEX IF EXISTS "{name}"')
+                self.report('Без индексов', sample)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, options):
+        rnd = random.Random(options['seed'])
+        prefix = f'explain-{time.time_ns()}'
+        User.objects.bulk_create(
+            (User(username=f'{prefix}-{number}')
+             for number in range(options['authors'])),
+            batch_size=c.BULK_BATCH_SIZE,
+        )
+        authors = list(User.objects.filter(username__startswith=prefix))
+        Group.objects.bulk_create(
+            (Group(title=f'{prefix}-{number}', slug=f'{prefix}-{number}',
+                   description=prefix)
+             for number in range(options['groups'])),
+            batch_size=c.BULK_BATCH_SIZE,
+        )
+        groups = list(Group.objects.filter(slug__startswith=prefix))
+        Post.objects.bulk_create(
+            (Post(text=prefix, author=rnd.choice(authors),
+                  group=rnd.choice(groups + [None]))
+             for _ in range(options['posts'])),
+            batch_size=c.BULK_BATCH_SIZE,
+        )
+        post = Post.objects.filter(text=prefix).first()
+        Comment.objects.bulk_create(
+            (Comment(post=post, author=rnd.choice(authors), text=prefix)
+             for _ in range(options['posts'] // 10)),
+            batch_size=c.BULK_BATCH_SIZE,
+        )
+        hot.rebuild()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        return {'author': authors[0], 'group': groups[0], 'post': post}
+
+    def queries(self, sample):
+        listing = Post.objects.for_listing()
+        return {
+            'index': listing[:10],
+            'group_posts': listing.filter(group=sample['group'])[:10],
+            'profile': listing.filter(author=sample['author'])[:10],
+            'hot': PostScore.objects.order_by('-rank', '-post_id').values(
+                'post_id')[:10],
+            'comments': Comment.objects.filter(
+                post=sample['post']).order_by('created')[:10],
+        }
+
+    def report(self, title, sample):
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+        with connection.cursor() as cursor:
+            for name, queryset in self.queries(sample).items():
+                sql, params = queryset.query.sql_with_params()
+                # Текст отличается между прогонами, чтобы sqlite3 не взял
+                # план из кеша подготовленных выражений.
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql} /* {title} */',
+                               params)
+                plan = [row[-1] for row in cursor.fetchall()]
+                started = time.perf_counter()
+                for _ in range(self.repeat):
+                    cursor.execute(sql, params)
+                    cursor.fetchall()
+                elapsed = (time.perf_counter() - started) / self.repeat
+                self.stdout.write(f'  {name}: {elapsed * 1000:.2f} мс')
+                for line in plan:
+                    self.stdout.write(f'    {line}')
@@ -0,0 +1,63 @@
+import json
+import urllib.error
+import urllib.request
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.benchmarks import load
+
+
+class Command(BaseCommand):
+    help = ('Нагружает запущенные серверы одновременными запросами и '
+            'сравнивает пропускную способность (например, WSGI с '
+            'YATUBE_CONCURRENT_READS=1 и без)')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'targets', nargs='+',
+            help='Базовые адреса серверов, например http://127.0.0.1:8000',
+        )
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Путь страницы, можно указать несколько раз (по умолчанию /)',
+        )
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument('--timeout', type=float, default=10)
+        parser.add_argument(
+            '--cookie', help='Заголовок Cookie, например sessionid=...')
+
+    def fetch(self, url):
+        request = urllib.request.Request(url)
+        if self.cookie:
+            request.add_header('Cookie', self.cookie)
+        try:
+            with urllib.request.urlopen(request,
+                                        timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as error:
+            return error.code
+        except OSError:
+            return None
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError('--concurrency и --requests должны быть > 0')
+        self.cookie = options['cookie']
+        self.timeout = options['timeout']
+        paths = options['paths'] or ['/']
+        results = {}
+        for target in options['targets']:
+            urls = [target.rstrip('/') + path for path in paths]
+            if options['warmup']:
+                load(self.fetch, urls, options['concurrency'],
+                     options['warmup'])
+            results[target] = load(self.fetch, urls, options['concurrency'],
+                                   options['requests'])
+            self.stderr.write(
+                f"{target}: {results[target]['rps']} запросов/с, "
+                f"p95 {results[target]['p95_ms']} мс, "
+                f"ошибок {results[target]['errors']}")
+        self.stdout.write(json.dumps(results, ensure_ascii=False, indent=2))
@@ -0,0 +1,64 @@
+import json
+import statistics
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.benchmarks import percentile
+
+
+class Command(BaseCommand):
+    help = ('Сводка по логу профилирования: самые медленные представления, '
+            'их SQL и шаблоны')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', default=None,
+                            help='Путь к логу (по умолчанию PROFILING_LOG)')
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--templates', type=int, default=3,
+                            help='Сколько шаблонов показать для страницы')
+
+    def read(self, path):
+        try:
+            with open(path, encoding='utf-8') as file_:
+                for line in file_:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            raise CommandError(f'Нет лога {path}: включите YATUBE_PROFILING')
+
+    def handle(self, *args, **options):
+        records = defaultdict(list)
+        for record in self.read(options['log'] or settings.PROFILING_LOG):
+            records[record.get('view') or record['path']].append(record)
+        summary = []
+        for view, items in records.items():
+            totals = [item['total_ms'] for item in items]
+            templates = defaultdict(float)
+            for item in items:
+                for name, stats in item.get('templates', {}).items():
+                    templates[name] += stats['ms'] / len(items)
+            summary.append({
+                'view': view,
+                'requests': len(items),
+                'p50': percentile(totals, 0.5),
+                'p95': percentile(totals, 0.95),
+                'sql_count': statistics.mean(
+                    item['sql_count'] for item in items),
+                'sql_ms': statistics.mean(item['sql_ms'] for item in items),
+                'templates': sorted(
+                    templates.items(), key=lambda pair: pair[1],
+                    reverse=True)[:options['templates']],
+            })
+        summary.sort(key=lambda row: row['p95'], reverse=True)
+        for row in summary[:options['limit']]:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{row['view']}: p95 {row['p95']:.1f} мс, "
+                f"p50 {row['p50']:.1f} мс, запросов {row['requests']}"))
+            self.stdout.write(f"  SQL: {row['sql_count']:.1f} запросов, "
+                              f"{row['sql_ms']:.1f} мс")
+            for name, elapsed in row['templates']:
+                self.stdout.write(f'  {name}: {elapsed:.1f} мс')
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.counters import recount_comments, recount_posts, recount_users
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает денормализованные счётчики пользователей, '
+            'записей и комментариев')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            users = recount_users()
+            posts = recount_posts()
+            comments = recount_comments()
+        self.stdout.write(
+            f'Пересчитано пользователей: {users}, записей: {posts}, '
+            f'комментариев: {comments}')
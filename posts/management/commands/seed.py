@@ -0,0 +1,244 @@
+import bisect
+import datetime as dt
+import itertools
+import random
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from posts import cache, feed, search
+from posts.counters import recount_posts, recount_users
+from posts.models import Comment, Follow, Group, Post, User
+from posts import constants as c
+
+
+@contextmanager
+def explicit_dates(*fields):
+    # bulk_create сам проставляет auto_now_add, а нам нужны даты из
+    # генератора: выключаем флаг на время вставки.
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def zipf_weights(size, alpha):
+    total = 0.0
+    weights = []
+    for rank in range(1, size + 1):
+        total += 1 / rank ** alpha
+        weights.append(total)
+    return weights
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими пользователями, группами, '
+            'записями, комментариями и подписками (детерминировано по seed)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=300000)
+        parser.add_argument(
+            '--follows', type=float, default=20,
+            help='Среднее число подписок на пользователя',
+        )
+        parser.add_argument(
+            '--alpha', type=float, default=1.1,
+            help='Показатель степенного закона популярности авторов',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней до --end распределены записи',
+        )
+        parser.add_argument('--end', default='2026-01-01',
+                            help='Дата последней записи (ISO)')
+        parser.add_argument('--prefix', default='seed')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--feed-limit', type=int, default=c.PGR,
+            help='Сколько записей автора положить в ленты подписчиков',
+        )
+        parser.add_argument(
+            '--skip-derived', action='store_true',
+            help='Не пересчитывать счётчики, ленты и поисковый индекс',
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 2:
+            raise CommandError('Нужно хотя бы два пользователя')
+        prefix = f"{options['prefix']}-"
+        if (User.objects.filter(username__startswith=prefix).exists()
+                or Group.objects.filter(slug__startswith=prefix).exists()):
+            raise CommandError(f'Данные {prefix}* уже есть, '
+                               f'укажите другой --prefix')
+        self.rnd = random.Random(options['seed'])
+        self.options = options
+        end = timezone.make_aware(dt.datetime.fromisoformat(options['end']))
+        self.start = end - dt.timedelta(days=options['days'])
+        self.span = options['days'] * 24 * 3600
+        with transaction.atomic():
+            users = self.seed_users()
+            groups = self.seed_groups()
+            posts = self.seed_posts(users, groups)
+            self.seed_comments(users, posts)
+            self.seed_follows(users)
+        if not options['skip_derived']:
+            self.rebuild_derived(users)
+
+    def next_pk(self, model):
+        return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+    def insert(self, model, rows, total):
+        rows = iter(rows)
+        done = 0
+        while True:
+            batch = list(itertools.islice(rows, c.BULK_BATCH_SIZE * 20))
+            if not batch:
+                break
+            model.objects.bulk_create(batch, batch_size=c.BULK_BATCH_SIZE)
+            done += len(batch)
+            self.stdout.write(f'\r  {model.__name__}: {done}/{total}',
+                              ending='')
+        self.stdout.write('')
+
+    def seed_users(self):
+        count = self.options['users']
+        first = self.next_pk(User)
+        password = make_password(None)
+        joined = self.start
+        prefix = self.options['prefix']
+        self.insert(User, (
+            User(pk=first + number, username=f'{prefix}-{number}',
+                 first_name='Автор', last_name=str(number),
+                 password=password, date_joined=joined)
+            for number in range(count)
+        ), count)
+        return range(first, first + count)
+
+    def seed_groups(self):
+        count = self.options['groups']
+        first = self.next_pk(Group)
+        prefix = self.options['prefix']
+        self.insert(Group, (
+            Group(pk=first + number, title=f'Группа {number}',
+                  slug=f'{prefix}-{number}',
+                  description=f'Синтетическая группа {number}')
+            for number in range(count)
+        ), count)
+        return range(first, first + count)
+
+    def burst_times(self, count):
+        # Записи идут всплесками: центры всплесков равномерны по периоду,
+        # внутри всплеска интервалы экспоненциальные (минуты).
+        rnd = self.rnd
+        centers = sorted(rnd.uniform(0, self.span)
+                         for _ in range(max(1, count // 50)))
+        for _ in range(count):
+            offset = rnd.choice(centers) + rnd.expovariate(1 / 600)
+            yield min(offset, self.span)
+
+    def seed_posts(self, users, groups):
+        count = self.options['posts']
+        first = self.next_pk(Post)
+        rnd = self.rnd
+        authors = zipf_weights(len(users), self.options['alpha'])
+        topics = zipf_weights(len(groups), 1.0) if groups else None
+        offsets = sorted(self.burst_times(count))
+
+        def rows():
+            for number, offset in enumerate(offsets):
+                author = users[bisect.bisect(authors,
+                                             rnd.random() * authors[-1])]
+                group = None
+                if topics and rnd.random() < 0.7:
+                    group = groups[bisect.bisect(topics,
+                                                 rnd.random() * topics[-1])]
+                yield Post(
+                    pk=first + number,
+                    text=f'Запись {number} автора {author}',
+                    author_id=author,
+                    group_id=group,
+                    pub_date=self.start + dt.timedelta(seconds=offset),
+                )
+
+        with explicit_dates(Post._meta.get_field('pub_date')):
+            self.insert(Post, rows(), count)
+        return first, offsets
+
+    def seed_comments(self, users, posts):
+        count = self.options['comments']
+        first_post, offsets = posts
+        if not offsets:
+            return
+        rnd = self.rnd
+        popular = zipf_weights(len(offsets), self.options['alpha'])
+        # Популярность не должна совпадать с возрастом записи.
+        order = list(range(len(offsets)))
+        rnd.shuffle(order)
+
+        def rows():
+            for number in range(count):
+                index = order[bisect.bisect(popular,
+                                            rnd.random() * popular[-1])]
+                delay = rnd.expovariate(1 / 3600)
+                yield Comment(
+                    post_id=first_post + index,
+                    author_id=rnd.choice(users),
+                    text=f'Комментарий {number}',
+                    created=self.start + dt.timedelta(
+                        seconds=min(offsets[index] + delay, self.span)),
+                )
+
+        with explicit_dates(Comment._meta.get_field('created')):
+            self.insert(Comment, rows(), count)
+        Comment.objects.fill_paths()
+
+    def seed_follows(self, users):
+        rnd = self.rnd
+        popular = zipf_weights(len(users), self.options['alpha'])
+        mean = self.options['follows']
+        limit = len(users) - 1
+        total = round(mean * len(users))
+
+        def rows():
+            for user in users:
+                wanted = min(limit, int(rnd.expovariate(1 / mean))
+                             if mean else 0)
+                authors = set()
+                # Хвост распределения редок: ограничиваем число попыток.
+                for _ in range(wanted * 20):
+                    if len(authors) >= wanted:
+                        break
+                    author = users[bisect.bisect(popular,
+                                                 rnd.random() * popular[-1])]
+                    if author != user:
+                        authors.add(author)
+                for author in sorted(authors):
+                    yield Follow(user_id=user, author_id=author)
+
+        self.insert(Follow, rows(), f'~{total}')
+
+    def rebuild_derived(self, users):
+        with transaction.atomic():
+            self.stdout.write('Пересчёт счётчиков')
+            recount_users()
+            recount_posts()
+            feed.mark_heavy()
+            self.stdout.write('Заполнение лент подписок')
+            # Ленты растут как подписки × записи автора, поэтому по
+            # умолчанию заполняется только первая страница.
+            for author_id in users:
+                feed.add_followers_to_feed(author_id,
+                                           self.options['feed_limit'])
+            self.stdout.write('Перестроение поискового индекса')
+            search.get_backend().rebuild()
+        cache.bump(cache.POSTS_SCOPE)
@@ -0,0 +1,30 @@
+# Generated by Django 2.2.6 on 2026-10-18 19:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageVariant',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(help_text='Картинка записи, из которой получен вариант', max_length=255, verbose_name='Исходный файл')),
+                ('file', models.CharField(max_length=255, verbose_name='Файл')),
+                ('format', models.CharField(max_length=10, verbose_name='Формат')),
+                ('width', models.PositiveIntegerField(verbose_name='Ширина')),
+                ('height', models.PositiveIntegerField(verbose_name='Высота')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_variants', to='posts.Post', verbose_name='Публикация')),
+            ],
+            options={
+                'ordering': ('format', 'width'),
+                'unique_together': {('post', 'format', 'width')},
+            },
+        ),
+    ]
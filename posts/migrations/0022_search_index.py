@@ -0,0 +1,79 @@
+# Generated by Django 2.2.6 on 2026-10-18 19:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+import re
+import sqlite3
+from collections import Counter
+
+FTS_TABLE = 'posts_post_fts'
+
+
+def fts5_available(schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return False
+    try:
+        probe = sqlite3.connect(':memory:')
+        probe.execute('CREATE VIRTUAL TABLE probe USING fts5(text)')
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        probe.close()
+    return True
+
+
+def build_index(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    PostTerm = apps.get_model('posts', 'PostTerm')
+    if fts5_available(schema_editor):
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            f"text, tokenize='unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, text) '
+            f'SELECT id, text FROM {Post._meta.db_table}'
+        )
+        return
+    terms = (
+        PostTerm(post_id=post.pk, term=term, count=count)
+        for post in Post.objects.only('pk', 'text').iterator()
+        for term, count in Counter(
+            word for word in re.findall(r'\w+', post.text.lower())
+            if len(word) <= 64
+        ).items()
+    )
+    PostTerm.objects.bulk_create(terms, batch_size=500)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_imagevariant'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Слово')),
+                ('count', models.PositiveIntegerField(verbose_name='Вхождений')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='posts.Post', verbose_name='Публикация')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='postterm',
+            index=models.Index(fields=['term', 'post'], name='posts_term_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='postterm',
+            unique_together={('post', 'term')},
+        ),
+        migrations.RunPython(build_index, drop_index),
+    ]
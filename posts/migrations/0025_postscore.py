@@ -0,0 +1,27 @@
+# Generated by Django 2.2.6 on 2026-10-18 20:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0024_comment_thread'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostScore',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='hot', serialize=False, to='posts.Post', verbose_name='Публикация')),
+                ('score', models.FloatField(help_text='Затухающая сумма весов на момент пересчёта', verbose_name='Оценка')),
+                ('rank', models.FloatField(help_text='ln(оценки) + скорость затухания × время пересчёта', verbose_name='Ранг')),
+                ('updated', models.DateTimeField(verbose_name='Пересчитано')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='postscore',
+            index=models.Index(fields=['-rank', '-post'], name='posts_score_rank_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.6 on 2026-10-18 21:01
+
+from django.db import migrations, models
+
+FEED_FANOUT_LIMIT = 10000
+
+
+def mark_heavy(apps, schema_editor):
+    UserStats = apps.get_model('posts', 'UserStats')
+    UserStats.objects.filter(
+        followers_count__gt=FEED_FANOUT_LIMIT).update(feed_pull=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0025_postscore'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='feed_pull',
+            field=models.BooleanField(default=False, help_text='Записи не раскладываются подписчикам, а подтягиваются в ленту при чтении', verbose_name='Лента при чтении'),
+        ),
+        migrations.RunPython(mark_heavy, migrations.RunPython.noop),
+    ]
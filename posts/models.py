@@ -1,11 +1,28 @@
 from django.utils.text import Truncator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Concat, LPad
 from django.contrib.auth import get_user_model
 
+from . import constants as c
+
 
 User = get_user_model()
 
 
+class AtomicSaveMixin:
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+class PostQuerySet(models.QuerySet):
+    def for_listing(self):
+        return self.select_related('author', 'group').prefetch_related(
+            'image_variants',
+        ).order_by('-pub_date', '-id')
+
+
 class Group(models.Model):
     title = models.CharField(
         verbose_name='Заголовок',
@@ -26,7 +43,7 @@ class Group(models.Model):
         return self.title
 
 
-class Post(models.Model):
+class Post(AtomicSaveMixin, models.Model):
     text = models.TextField(
         verbose_name='Текст',
         help_text='Напишите текст',
@@ -54,17 +71,58 @@ class Post(models.Model):
     )
     image = models.ImageField(upload_to='posts/', blank=True, null=True,
                               verbose_name='Картинка')
-    objects = models.Manager()
+    comments_count = models.PositiveIntegerField(
+        verbose_name='Комментариев',
+        default=0,
+        editable=False,
+    )
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='posts_post_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='posts_post_group_date_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='posts_post_author_date_idx'),
+        ]
 
     def __str__(self):
         self.text = Truncator(self.text).words(10)
         return self.text
 
 
-class Comment(models.Model):
+class CommentManager(models.Manager):
+    def fill_paths(self, post_ids=None):
+        """Пути для комментариев, вставленных в обход save().
+
+        Корни получают путь одним UPDATE, ответы — по UPDATE на уровень
+        вложенности (путь родителя к этому времени уже заполнен). С
+        post_ids ищутся только комментарии этих записей — по индексу
+        (post, path), а не перебором всей таблицы.
+        """
+        unfilled = self.filter(path='')
+        if post_ids is not None:
+            unfilled = unfilled.filter(post_id__in=post_ids)
+        own = LPad(Cast('pk', models.CharField()), c.COMMENT_PATH_STEP,
+                   Value('0'))
+        # Корни отбираются по depth: условие parent IS NULL подходит почти
+        # всем строкам, и SQLite выбрал бы индекс parent вместо (post, path).
+        filled = unfilled.filter(depth=0).update(path=own)
+        parent_path = Subquery(
+            self.filter(pk=OuterRef('parent_id')).values('path')[:1])
+        for depth in range(1, c.COMMENT_MAX_DEPTH + 1):
+            if not unfilled.exists():
+                break
+            filled += unfilled.filter(depth=depth).update(
+                path=Concat(parent_path, own,
+                            output_field=models.CharField()))
+        return filled
+
+
+class Comment(AtomicSaveMixin, models.Model):
     post = models.ForeignKey(
         Post,
         verbose_name='Публикация',
@@ -87,9 +145,62 @@ class Comment(models.Model):
         auto_now_add=True,
         help_text='Дата',
     )
+    parent = models.ForeignKey(
+        'self',
+        verbose_name='Ответ на',
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='replies',
+    )
+    path = models.CharField(
+        verbose_name='Путь в ветке',
+        max_length=c.COMMENT_PATH_STEP * (c.COMMENT_MAX_DEPTH + 1),
+        default='',
+        editable=False,
+        help_text='Первичные ключи предков и самого комментария',
+    )
+    depth = models.PositiveSmallIntegerField(
+        verbose_name='Уровень вложенности',
+        default=0,
+        editable=False,
+    )
+    replies_count = models.PositiveIntegerField(
+        verbose_name='Ответов',
+        default=0,
+        editable=False,
+    )
+    objects = CommentManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'created'],
+                         name='posts_comment_post_idx'),
+            models.Index(fields=['post', 'path'],
+                         name='posts_comment_thread_idx'),
+            models.Index(fields=['created'],
+                         name='posts_comment_created_idx'),
+        ]
 
+    def set_parent(self, parent):
+        # Глубже предела ответ встаёт рядом с родителем.
+        if parent is not None and parent.depth >= c.COMMENT_MAX_DEPTH:
+            parent = parent.parent
+        self.parent = parent
+        self.depth = parent.depth + 1 if parent is not None else 0
 
-class Follow(models.Model):
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            if self._state.adding and self.parent_id is not None:
+                self.set_parent(self.parent)
+            super().save(*args, **kwargs)
+            if not self.path:
+                prefix = self.parent.path if self.parent_id else ''
+                self.path = prefix + str(self.pk).zfill(c.COMMENT_PATH_STEP)
+                Comment.objects.filter(pk=self.pk).update(path=self.path)
+
+
+class Follow(AtomicSaveMixin, models.Model):
     user = models.ForeignKey(
         User,
         verbose_name='Пользователь',
@@ -106,3 +217,153 @@ class Follow(models.Model):
         help_text='Автор поста',
         null=True,
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'author'],
+                                    name='posts_follow_unique'),
+        ]
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Записей',
+        default=0,
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Подписчиков',
+        default=0,
+    )
+    following_count = models.PositiveIntegerField(
+        verbose_name='Подписок',
+        default=0,
+    )
+    feed_pull = models.BooleanField(
+        verbose_name='Лента при чтении',
+        default=False,
+        help_text='Записи не раскладываются подписчикам, '
+                  'а подтягиваются в ленту при чтении',
+    )
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        verbose_name='Подписчик',
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+    )
+    post = models.ForeignKey(
+        Post,
+        verbose_name='Публикация',
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+    )
+    author = models.ForeignKey(
+        User,
+        verbose_name='Автор',
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации',
+    )
+
+    class Meta:
+        ordering = ('-pub_date', '-post_id')
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='posts_feed_user_date_idx'),
+            models.Index(fields=['user', 'author'],
+                         name='posts_feed_user_author_idx'),
+        ]
+
+
+class ImageVariant(models.Model):
+    post = models.ForeignKey(
+        Post,
+        verbose_name='Публикация',
+        on_delete=models.CASCADE,
+        related_name='image_variants',
+    )
+    source = models.CharField(
+        verbose_name='Исходный файл',
+        max_length=255,
+        help_text='Картинка записи, из которой получен вариант',
+    )
+    file = models.CharField(
+        verbose_name='Файл',
+        max_length=255,
+    )
+    format = models.CharField(
+        verbose_name='Формат',
+        max_length=10,
+    )
+    width = models.PositiveIntegerField(
+        verbose_name='Ширина',
+    )
+    height = models.PositiveIntegerField(
+        verbose_name='Высота',
+    )
+
+    class Meta:
+        ordering = ('format', 'width')
+        unique_together = ('post', 'format', 'width')
+
+
+class PostTerm(models.Model):
+    post = models.ForeignKey(
+        Post,
+        verbose_name='Публикация',
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+    )
+    term = models.CharField(
+        verbose_name='Слово',
+        max_length=c.SEARCH_TERM_MAX_LENGTH,
+    )
+    count = models.PositiveIntegerField(
+        verbose_name='Вхождений',
+    )
+
+    class Meta:
+        unique_together = ('post', 'term')
+        indexes = [
+            models.Index(fields=['term', 'post'],
+                         name='posts_term_idx'),
+        ]
+
+
+class PostScore(models.Model):
+    post = models.OneToOneField(
+        Post,
+        verbose_name='Публикация',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='hot',
+    )
+    score = models.FloatField(
+        verbose_name='Оценка',
+        help_text='Затухающая сумма весов на момент пересчёта',
+    )
+    rank = models.FloatField(
+        verbose_name='Ранг',
+        help_text='ln(оценки) + скорость затухания × время пересчёта',
+    )
+    updated = models.DateTimeField(
+        verbose_name='Пересчитано',
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-rank', '-post'],
+                         name='posts_score_rank_idx'),
+        ]
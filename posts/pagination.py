@@ -0,0 +1,388 @@
+"""Keyset-пагинация по паре (pub_date, id) вместо LIMIT/OFFSET.
+
+Курсор — непрозрачный токен с ключом граничной записи и направлением.
+Страница не делает COUNT(*): приблизительное число записей берётся из
+статистики базы (estimated_count) и кешируется.
+"""
+import base64
+import hashlib
+import json
+
+from django.core.cache import caches
+from django.core.paginator import Page, Paginator
+from django.db import connections
+from django.db.models import Max, Q
+from django.utils.functional import cached_property
+
+from . import constants as c
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def _index_stats(queryset):
+    """[(столбцы индекса, [строк всего, строк на префикс, ...])] из
+    sqlite_stat1; пусто, если ANALYZE не запускали или база не SQLite."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'sqlite':
+        return []
+    table = queryset.model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master "
+                       "WHERE type = 'table' AND name = 'sqlite_stat1'")
+        if cursor.fetchone() is None:
+            return []
+        cursor.execute('SELECT idx, stat FROM sqlite_stat1 WHERE tbl = %s',
+                       [table])
+        rows = cursor.fetchall()
+        constraints = connection.introspection.get_constraints(cursor, table)
+    stats = []
+    for index, stat in rows:
+        numbers = [int(part) for part in stat.split() if part.isdigit()]
+        columns = constraints.get(index, {}).get('columns') or []
+        stats.append((columns, numbers))
+    return stats
+
+
+def estimated_count(queryset):
+    """Оценка числа строк queryset без COUNT(*); None, если оценить нечем.
+
+    Оценивается только вся таблица: число строк из статистики SQLite (после
+    ANALYZE), а без неё MAX(pk). Для выборки с фильтром статистика даёт
+    лишь среднее по всем значениям, поэтому оценки нет — точное число
+    берётся из счётчиков (см. CursorPaginator, known_count).
+    """
+    if queryset.query.where.children:
+        return None
+    stats = _index_stats(queryset)
+    if stats:
+        return stats[0][1][0]
+    return queryset.model._default_manager.using(queryset.db).aggregate(
+        rows=Max('pk'))['rows'] or 0
+
+
+def cached_estimate(queryset, timeout):
+    """estimated_count, закешированная на timeout секунд."""
+    query = str(queryset.query).encode()
+    key = 'posts:estimate:' + hashlib.md5(query).hexdigest()
+    return caches[c.CACHE_ALIAS].get_or_set(
+        key, lambda: estimated_count(queryset), timeout)
+
+
+def seek(queryset, fields, key, lookup):
+    """Строки queryset строго за ключом key по полям fields.
+
+    lookup — 'lt' для обхода по убыванию, 'gt' — по возрастанию.
+    """
+    condition = Q()
+    for position, field in enumerate(fields):
+        step = Q(**{f'{field}__{lookup}': key[position]})
+        for previous, value in zip(fields[:position], key):
+            step &= Q(**{previous: value})
+        condition |= step
+    return queryset.filter(condition)
+
+
+class CursorPage:
+    def __init__(self, paginator, object_list, cursor_key, direction,
+                 offset=0):
+        self.paginator = paginator
+        self.object_list = object_list
+        self.cursor_key = cursor_key
+        self.direction = direction
+        self.offset = offset
+
+    def __repr__(self):
+        return f'<CursorPage {self.direction}:{self.cursor_key}>'
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+    @cached_property
+    def items(self):
+        return list(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    @cached_property
+    def _has_next(self):
+        if self.direction == PREVIOUS:
+            return True
+        if len(self) < self.paginator.per_page:
+            return False
+        return self.paginator.after(self.items[-1]).exists()
+
+    @cached_property
+    def _has_previous(self):
+        if self.direction == NEXT:
+            return self.cursor_key is not None or self.offset > 0
+        if not self.items:
+            return False
+        return self.paginator.before(self.items[0]).exists()
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if self.has_next() and self.items:
+            return self.paginator.encode(self.items[-1], NEXT)
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous() and self.items:
+            return self.paginator.encode(self.items[0], PREVIOUS)
+        return None
+
+
+class CursorPaginator:
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-id'),
+                 count_timeout=None, known_count=None):
+        descending = {field.startswith('-') for field in ordering}
+        if len(descending) != 1:
+            raise ValueError('Все поля ordering должны иметь одно направление')
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.descending = descending.pop()
+        self.fields = tuple(field.lstrip('-') for field in ordering)
+        self.count_timeout = count_timeout
+        self.known_count = known_count
+
+    def key(self, obj):
+        return tuple(getattr(obj, field) for field in self.fields)
+
+    @property
+    def key_model(self):
+        return self.object_list.model
+
+    def encode(self, obj, direction):
+        values = []
+        for value in self.key(obj):
+            values.append(value.isoformat() if hasattr(value, 'isoformat')
+                          else value)
+        raw = json.dumps([direction, values], separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, values = json.loads(base64.urlsafe_b64decode(padded))
+            if direction not in (NEXT, PREVIOUS):
+                raise ValueError(direction)
+            if len(values) != len(self.fields):
+                raise ValueError(values)
+            model = self.key_model
+            key = tuple(
+                model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.fields, values)
+            )
+        except Exception as error:
+            raise InvalidCursor(cursor) from error
+        return key, direction
+
+    def _seek(self, key, forward):
+        lookup = 'lt' if forward == self.descending else 'gt'
+        return seek(self.object_list, self.fields, key, lookup)
+
+    def after(self, obj):
+        return self._seek(self.key(obj), forward=True)
+
+    def before(self, obj):
+        return self._seek(self.key(obj), forward=False)
+
+    def _reversed_ordering(self):
+        return tuple(field.lstrip('-') if field.startswith('-') else
+                     f'-{field}' for field in self.ordering)
+
+    def page(self, cursor=None):
+        if cursor is None:
+            rows = self.object_list.order_by(*self.ordering)
+            return CursorPage(self, rows[:self.per_page], None, NEXT)
+        key, direction = self.decode(cursor)
+        if direction == NEXT:
+            rows = self._seek(key, forward=True).order_by(*self.ordering)
+            return CursorPage(self, rows[:self.per_page], key, direction)
+        window = (
+            self._seek(key, forward=False)
+            .order_by(*self._reversed_ordering())
+            .values('pk')[:self.per_page]
+        )
+        rows = self.object_list.filter(pk__in=window).order_by(*self.ordering)
+        return CursorPage(self, rows, key, direction)
+
+    def get_page(self, cursor=None):
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
+
+    def legacy_page(self, number):
+        """Страница по старой ссылке ?page=N: одно смещение, дальше курсоры.
+
+        Номера больше LEGACY_PAGE_LIMIT открывают первую страницу: глубокое
+        смещение читало бы (и сливало по источникам) все строки до него.
+        """
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            number = 1
+        if not 1 < number <= c.LEGACY_PAGE_LIMIT:
+            return self.page()
+        return self.offset_page((number - 1) * self.per_page)
+
+    def offset_page(self, offset):
+        rows = self.object_list.order_by(*self.ordering)
+        return CursorPage(self, rows[offset:offset + self.per_page], None,
+                          NEXT, offset)
+
+    @cached_property
+    def approximate_count(self):
+        if self.known_count is not None:
+            return self.known_count
+        if self.count_timeout is None:
+            return None
+        return cached_estimate(self.object_list, self.count_timeout)
+
+
+class IndexRows:
+    """Строки за ключом key, не больше limit (после offset).
+
+    Ключи каждого источника читаются срезом по его индексу и сливаются в
+    Python, сами объекты — из object_list по первичному ключу.
+    """
+    def __init__(self, paginator, key, forward, limit, offset=0):
+        self.paginator = paginator
+        self.key = key
+        self.forward = forward
+        self.limit = limit
+        self.offset = offset
+
+    def keys(self):
+        descending = self.forward == self.paginator.descending
+        keys = []
+        for queryset, fields in self.paginator.sources:
+            if self.key is not None:
+                queryset = seek(queryset, fields, self.key,
+                                'lt' if descending else 'gt')
+            ordering = [f'-{field}' if descending else field
+                        for field in fields]
+            keys.extend(queryset.order_by(*ordering).values_list(*fields)[
+                :self.offset + self.limit])
+        keys.sort(reverse=descending)
+        return keys[self.offset:self.offset + self.limit]
+
+    def exists(self):
+        return bool(self.keys())
+
+    def __iter__(self):
+        keys = self.keys()
+        objects = self.paginator.object_list.in_bulk(
+            [key[-1] for key in keys])
+        rows = []
+        for key in keys:
+            obj = objects.get(key[-1])
+            if obj is not None:
+                obj.cursor_key = key
+                rows.append(obj)
+        if not self.forward:
+            rows.reverse()
+        return iter(rows)
+
+
+class IndexPaginator(CursorPaginator):
+    """CursorPaginator, у которого ключи страницы берутся из sources.
+
+    sources — список пар (queryset, поля ключа); последнее поле — первичный
+    ключ объекта в object_list. Подходит, когда порядок задан другой
+    таблицей или несколькими источниками сразу.
+    """
+    sources = ()
+
+    def key(self, obj):
+        return obj.cursor_key
+
+    def page(self, cursor=None):
+        if cursor is None:
+            return self.offset_page(0)
+        key, direction = self.decode(cursor)
+        rows = IndexRows(self, key, direction == NEXT, self.per_page)
+        return CursorPage(self, rows, key, direction)
+
+    def offset_page(self, offset):
+        rows = IndexRows(self, None, True, self.per_page, offset)
+        return CursorPage(self, rows, None, NEXT, offset)
+
+    def after(self, obj):
+        return IndexRows(self, self.key(obj), True, 1)
+
+    def before(self, obj):
+        return IndexRows(self, self.key(obj), False, 1)
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator для админки: число строк — оценка по статистике базы.
+
+    Если оценить нельзя, считается не больше COUNT_SCAN_LIMIT строк.
+    """
+
+    @cached_property
+    def count(self):
+        estimate = cached_estimate(self.object_list,
+                                   c.APPROXIMATE_COUNT_TIMEOUT)
+        if estimate is not None:
+            return estimate
+        return self.object_list[:c.COUNT_SCAN_LIMIT].count()
+
+
+class _Lookahead:
+    """Длина первой страницы плюс одна запись, если есть следующая.
+
+    По ней Paginator считает has_next() без COUNT(*).
+    """
+    def __init__(self, page):
+        self.page = page
+
+    def __len__(self):
+        return len(self.page) + self.page.has_next()
+
+
+def paginate(request, queryset, per_page=c.PGR, paginator=None):
+    """Контекст страницы списка; все страницы читаются по ключу.
+
+    Первая страница отдаётся как привычные Paginator и Page, но без
+    COUNT(*) и OFFSET; курсоры для ссылок лежат в cursor_page. Старые
+    ссылки ?page=N открываются одним смещением, а дальше ведут курсоры.
+    Страница ленивая: при попадании в кеш фрагмента шаблона запросов к
+    базе нет.
+    """
+    keyset = paginator or CursorPaginator(
+        queryset, per_page, count_timeout=c.APPROXIMATE_COUNT_TIMEOUT)
+    cursor = request.GET.get('cursor')
+    if cursor:
+        page = keyset.get_page(cursor)
+        return {'page': page, 'paginator': keyset, 'cursor_page': page}
+    first = keyset.legacy_page(request.GET.get('page'))
+    if first.offset:
+        return {'page': first, 'paginator': keyset, 'cursor_page': first}
+    paginator = Paginator(_Lookahead(first), keyset.per_page)
+    return {
+        'page': Page(first, 1, paginator),
+        'paginator': paginator,
+        'cursor_page': first,
+    }
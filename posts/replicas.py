@@ -0,0 +1,129 @@
+"""Чтение страниц ленты с реплик базы (YATUBE_DB_REPLICAS).
+
+Реплики — дополнительные алиасы DATABASES из настройки DATABASE_REPLICAS.
+ReplicaRouter отправляет все записи в default, а чтения моделей из
+REPLICA_APPS — на реплику только внутри представлений, обёрнутых в
+replica_reads (index, group_posts, profile, post_view, follow_index):
+формы, вход и сессии читают основную базу.
+
+Реплика может отставать, поэтому после записи пользователь какое-то время
+читает основную базу. StickyWritesMiddleware замечает INSERT/UPDATE/DELETE
+в default за время запроса (и записи, поставленные в очередь posts.writes
+через mark_write) и кладёт в сессию срок REPLICA_STICKY_SECONDS; пока он
+не истёк, replica_reads реплику не выбирает.
+
+Версии областей кеша основная база увеличивает сразу, а реплика может
+ещё отдавать старые строки. Поэтому страницы с реплики кешируются под
+отдельным ключом и ETag с меткой replica_mark, которая меняется каждые
+REPLICA_CACHE_SECONDS: чужое отставание видно не дольше этого срока, а
+страницы с основной базы им не затираются.
+"""
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_APPS = ('posts', 'auth')
+STICKY_SESSION_KEY = '_replica_sticky_until'
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+SAFE_METHODS = ('GET', 'HEAD')
+
+_replica = ContextVar('yatube_replica', default=None)
+_wrote = ContextVar('yatube_wrote', default=None)
+
+
+def current():
+    """Алиас реплики текущего представления или None."""
+    return _replica.get()
+
+
+def replica_mark():
+    """Метка ключей кеша и ETag страницы с реплики; '' для основной базы."""
+    if current() is None:
+        return ''
+    period = int(time.time() // settings.REPLICA_CACHE_SECONDS)
+    return f'replica:{period}'
+
+
+def mark_write():
+    """Отметить запись в текущем запросе (сделать сессию «липкой»)."""
+    wrote = _wrote.get()
+    if wrote is not None:
+        wrote.append(True)
+
+
+def is_sticky(request):
+    # Без куки сессии не было и записей: не создаём сессию зря.
+    if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+        return False
+    return request.session.get(STICKY_SESSION_KEY, 0) > time.time()
+
+
+def choose_replica(request):
+    if not settings.DATABASE_REPLICAS or request.method not in SAFE_METHODS:
+        return None
+    if is_sticky(request):
+        return None
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+def replica_reads(view):
+    """Читать модели REPLICA_APPS с одной реплики на весь запрос."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        alias = choose_replica(request)
+        if alias is None:
+            return view(request, *args, **kwargs)
+        token = _replica.set(alias)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _replica.reset(token)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = _replica.get()
+        if alias is not None and model._meta.app_label in REPLICA_APPS:
+            return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+
+class StickyWritesMiddleware:
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        wrote = []
+        token = _wrote.set(wrote)
+
+        def watch(execute, sql, params, many, context):
+            if sql.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+                wrote.append(True)
+            return execute(sql, params, many, context)
+
+        try:
+            with connections[DEFAULT_DB_ALIAS].execute_wrapper(watch):
+                response = self.get_response(request)
+        finally:
+            _wrote.reset(token)
+        if wrote and hasattr(request, 'session'):
+            request.session[STICKY_SESSION_KEY] = (
+                time.time() + settings.REPLICA_STICKY_SECONDS)
+        return response
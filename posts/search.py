@@ -0,0 +1,178 @@
+"""Полнотекстовый поиск по записям.
+
+На SQLite со сборкой FTS5 используется виртуальная таблица
+``posts_post_fts`` (rowid совпадает с id записи, ранжирование bm25).
+Иначе работает обратный индекс на чистом Python: таблица PostTerm
+хранит, сколько раз слово встречается в записи, а ранг считается как
+сумма tf-idf совпавших слов. Обе реализации обновляются сигналами Post
+и отдают QuerySet записей, упорядоченный по релевантности, поэтому к
+нему можно добавить фильтры и пагинацию.
+"""
+import math
+import re
+from collections import Counter
+
+from django.db import connection
+from django.db.models import (Case, Count, F, FloatField, OuterRef, Q,
+                              Subquery, Sum, When)
+
+from .models import Post, PostTerm
+from . import constants as c
+
+FTS_TABLE = 'posts_post_fts'
+WORD_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return [word for word in WORD_RE.findall(text.lower())
+            if len(word) <= c.SEARCH_TERM_MAX_LENGTH]
+
+
+def fts_table_exists():
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+            [FTS_TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+class Fts5Backend:
+    name = 'fts5'
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                           [post.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                [post.pk, post.text],
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                           [post_id])
+
+    def remove_many(self, posts):
+        sql, params = posts.values('pk').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({sql})', params)
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                f'SELECT id, text FROM {Post._meta.db_table}'
+            )
+
+    def search(self, terms):
+        # Каждое слово в кавычках: операторы FTS5 из запроса не работают.
+        match = ' '.join('"{}"'.format(term) for term in terms)
+        return Post.objects.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = {Post._meta.db_table}.id',
+                   f'{FTS_TABLE} MATCH %s'],
+            params=[match],
+            select={'search_rank': f'-{FTS_TABLE}.rank'},
+        ).order_by('-search_rank', '-pub_date', '-id')
+
+
+class InvertedIndexBackend:
+    name = 'python'
+
+    def _terms(self, post):
+        return [
+            PostTerm(post_id=post.pk, term=term, count=count)
+            for term, count in Counter(tokenize(post.text)).items()
+        ]
+
+    def index(self, post):
+        PostTerm.objects.filter(post_id=post.pk).delete()
+        PostTerm.objects.bulk_create(self._terms(post),
+                                     batch_size=c.BULK_BATCH_SIZE)
+
+    def remove(self, post_id):
+        PostTerm.objects.filter(post_id=post_id).delete()
+
+    def remove_many(self, posts):
+        PostTerm.objects.filter(post__in=posts.values('pk')).delete()
+
+    def rebuild(self):
+        PostTerm.objects.all().delete()
+        posts = Post.objects.only('pk', 'text').iterator(
+            chunk_size=c.BULK_BATCH_SIZE)
+        PostTerm.objects.bulk_create(
+            (term for post in posts for term in self._terms(post)),
+            batch_size=c.BULK_BATCH_SIZE,
+        )
+
+    def search(self, terms):
+        terms = sorted(set(terms))
+        total = Post.objects.count() or 1
+        frequencies = dict(
+            PostTerm.objects.filter(term__in=terms).values('term')
+            .annotate(posts=Count('post')).values_list('term', 'posts')
+        )
+        if len(frequencies) < len(terms):
+            return Post.objects.none()
+        weight = Case(
+            *(When(term=term, then=F('count') * math.log(1 + total / found))
+              for term, found in frequencies.items()),
+            output_field=FloatField(),
+        )
+        matches = (
+            PostTerm.objects.filter(term__in=terms, post=OuterRef('pk'))
+            .values('post')
+            .annotate(matched=Count('term'), score=Sum(weight))
+            .filter(matched=len(terms))
+            .values('score')
+        )
+        return (
+            Post.objects.annotate(search_rank=Subquery(
+                matches, output_field=FloatField()))
+            .filter(search_rank__isnull=False)
+            .order_by('-search_rank', '-pub_date', '-id')
+        )
+
+
+_backends = {}
+
+
+def get_backend():
+    if connection.alias not in _backends:
+        _backends[connection.alias] = (
+            Fts5Backend() if fts_table_exists() else InvertedIndexBackend()
+        )
+    return _backends[connection.alias]
+
+
+def index_post(post):
+    get_backend().index(post)
+
+
+def remove_post(post_id):
+    get_backend().remove(post_id)
+
+
+def remove_posts(posts):
+    """Убрать из индекса записи queryset одним запросом."""
+    get_backend().remove_many(posts)
+
+
+def search(query, group=None, author=None):
+    """Записи по запросу, самые релевантные первыми."""
+    terms = tokenize(query)
+    if not terms:
+        return Post.objects.none()
+    results = get_backend().search(terms)
+    filters = Q()
+    if group is not None:
+        filters &= Q(group=group)
+    if author is not None:
+        filters &= Q(author=author)
+    return results.filter(filters).select_related('author', 'group')
@@ -0,0 +1,108 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from yatube.metrics import WRITES
+
+from .models import Comment, Follow, Group, Post, User
+from . import cache, counters, feed, hot, search, thumbnails
+
+
+def bump_post(post):
+    cache.bump(*cache.post_scopes(post))
+
+
+def bump_comment(comment):
+    if Comment._meta.get_field('post').is_cached(comment):
+        bump_post(comment.post)
+        return
+    post = Post.objects.filter(pk=comment.post_id).only(
+        'author_id', 'group_id').first()
+    if post is not None:
+        bump_post(post)
+
+
+def bump_follow(follow):
+    cache.bump(
+        cache.author_scope(follow.author_id),
+        cache.author_scope(follow.user_id),
+        cache.follow_scope(follow.user_id),
+    )
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.ensure_stats([instance.pk])
+
+
+@receiver(post_init, sender=Post)
+def post_loaded(sender, instance, **kwargs):
+    # Отложенные поля здесь не читаем: это запрос на каждый объект.
+    deferred = instance.get_deferred_fields()
+    instance._loaded_group_id = (
+        None if 'group_id' in deferred else instance.group_id)
+    instance._loaded_image = (
+        None if 'image' in deferred else instance.image.name)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.adjust_user(instance.author_id, posts_count=1)
+        feed.fan_out_post(instance)
+        hot.add_post(instance)
+        WRITES.inc(model='post')
+    if instance.image.name != instance._loaded_image or created:
+        thumbnails.schedule(instance)
+    search.index_post(instance)
+    bump_post(instance)
+    instance._loaded_group_id = instance.group_id
+    instance._loaded_image = instance.image.name
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.adjust_user(instance.author_id, posts_count=-1)
+    search.remove_post(instance.pk)
+    bump_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.adjust_post(instance.post_id, 1)
+        counters.adjust_replies(instance.parent_id, 1)
+        hot.add_comments({instance.post_id: 1}, instance.created)
+        WRITES.inc(model='comment')
+    bump_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.adjust_post(instance.post_id, -1)
+    counters.adjust_replies(instance.parent_id, -1)
+    bump_comment(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created and instance.user_id and instance.author_id:
+        counters.adjust_user(instance.author_id, followers_count=1)
+        counters.adjust_user(instance.user_id, following_count=1)
+        feed.mark_heavy([instance.author_id])
+        feed.add_author_to_feed(instance.user_id, instance.author_id)
+    bump_follow(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.adjust_user(instance.author_id, followers_count=-1)
+    counters.adjust_user(instance.user_id, following_count=-1)
+    feed.remove_author_from_feed(instance.user_id, instance.author_id)
+    bump_follow(instance)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    cache.bump(cache.group_scope(instance.pk))
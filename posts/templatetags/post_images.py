@@ -0,0 +1,19 @@
+from django import template
+
+from posts import thumbnails, variants
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(post, geometry, **options):
+    thumbnail = thumbnails.ready_thumbnail(post.image, geometry, **options)
+    if thumbnail is None:
+        thumbnails.submit(post)
+    return thumbnail
+
+
+@register.simple_tag
+def post_picture(post):
+    return variants.picture(post)
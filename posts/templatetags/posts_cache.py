@@ -0,0 +1,38 @@
+from django import template
+from django.template import NodeList
+from django.templatetags.cache import CacheNode, do_cache
+
+from yatube.metrics import TEMPLATE_CACHE
+
+
+register = template.Library()
+
+
+class TrackingNodeList(NodeList):
+    """Отмечает в render_context, что фрагмент пришлось отрендерить."""
+
+    def render(self, context):
+        context.render_context[self.owner] = True
+        return super().render(context)
+
+
+class MeteredCacheNode(CacheNode):
+    def render(self, context):
+        context.render_context[self] = False
+        value = super().render(context)
+        missed = context.render_context[self]
+        TEMPLATE_CACHE.inc(fragment=self.fragment_name,
+                           result='miss' if missed else 'hit')
+        return value
+
+
+@register.tag('cache')
+def metered_cache(parser, token):
+    """Тег {% cache %} из django со счётчиком попаданий и промахов."""
+    cached = do_cache(parser, token)
+    node = MeteredCacheNode(
+        TrackingNodeList(cached.nodelist), cached.expire_time_var,
+        cached.fragment_name, cached.vary_on, cached.cache_name,
+    )
+    node.nodelist.owner = node
+    return node
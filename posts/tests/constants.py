@@ -23,3 +23,6 @@ PUB_DATE = '06.01.2021'
 TITLE_2 = 'Тестовый заголовок второй'
 SLUG_2 = 'second-slug'
 DESCRIPTION_2 = 'Описание второй тестовой группы'
+PER_PAGE = 7
+HOT_URL = reverse('hot')
+FOLLOW_URL = reverse('follow_index')
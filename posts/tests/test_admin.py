@@ -0,0 +1,92 @@
+from django.contrib.admin import ACTION_CHECKBOX_NAME
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts import cache
+from posts.models import Comment, Follow, Group, Post, User
+from posts.search import search
+from . import constants as c
+
+POST_CHANGELIST_URL = reverse('admin:posts_post_changelist')
+
+
+class ModerationAdminTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        cls.spammer = User.objects.create_user(username='Spammer')
+        cls.author = User.objects.create_user(username='VasiaBasov')
+        cls.group = Group.objects.create(
+            title=c.TITLE,
+            slug=c.SLUG,
+            description=c.DESCRIPTION,
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая', slug='other', description=c.DESCRIPTION)
+        Follow.objects.create(user=cls.author, author=cls.spammer)
+
+    def setUp(self):
+        cache.get_cache().clear()
+        self.client = Client()
+        self.client.force_login(self.admin)
+        self.spam = [
+            Post.objects.create(text=f'купите слона {number}',
+                                author=self.spammer, group=self.group)
+            for number in range(3)
+        ]
+        self.post = Post.objects.create(text=c.TEXT, author=self.author,
+                                        group=self.group)
+        Comment.objects.create(post=self.spam[0], author=self.author,
+                               text='не надо')
+
+    def act(self, action, posts, **data):
+        return self.client.post(POST_CHANGELIST_URL, {
+            'action': action,
+            ACTION_CHECKBOX_NAME: [post.pk for post in posts],
+            **data,
+        })
+
+    def test_changelists(self):
+        """Списки в админке не делают запрос на строку."""
+        # Сессия, пользователь и строки страницы: COUNT(*) из кеша.
+        # Для записей ещё список групп в форме действия.
+        urls = (
+            (POST_CHANGELIST_URL, 4),
+            (reverse('admin:posts_comment_changelist'), 3),
+            (reverse('admin:posts_follow_changelist'), 3),
+        )
+        for url, queries in urls:
+            with self.subTest(url=url):
+                self.client.get(url)
+                with self.assertNumQueries(queries):
+                    response = self.client.get(url)
+                self.assertIsNone(response.context['cl'].full_result_count)
+
+    def test_username_filter(self):
+        """Фильтр по автору принимает имя пользователя."""
+        response = self.client.get(POST_CHANGELIST_URL,
+                                   {'author__username': 'Spammer'})
+        self.assertEqual(response.context['cl'].result_count, 3)
+
+    def test_delete_author_posts(self):
+        """Удаляются все записи спамера, счётчики и индекс в порядке."""
+        version = cache.versions(cache.group_scope(self.group.pk))
+        self.act('delete_author_posts', self.spam[:1])
+        self.assertFalse(Post.objects.filter(author=self.spammer).exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertTrue(Post.objects.filter(pk=self.post.pk).exists())
+        self.spammer.stats.refresh_from_db()
+        self.assertEqual(self.spammer.stats.posts_count, 0)
+        self.assertFalse(search('слона').exists())
+        self.assertNotEqual(
+            cache.versions(cache.group_scope(self.group.pk)), version)
+
+    def test_move_to_group(self):
+        """Записи переносятся в группу одним запросом."""
+        self.act('move_to_group', self.spam, group=self.other_group.pk)
+        self.assertEqual(
+            Post.objects.filter(group=self.other_group).count(), 3)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.group, self.group)
@@ -0,0 +1,112 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts.cache import get_cache
+from posts.constants import COMMENTS_PER_PAGE, PGR
+from posts.models import Comment, Follow, Group, Post, User
+from . import constants as c
+
+API_INDEX_URL = reverse('api:index')
+API_FOLLOW_URL = reverse('api:follow_index')
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='VasiaBasov')
+        cls.reader = User.objects.create_user(username='PetrBasov')
+        cls.group = Group.objects.create(
+            title=c.TITLE,
+            slug=c.SLUG,
+            description=c.DESCRIPTION,
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for number in range(PGR + 2):
+            Post.objects.create(text=f'{c.TEXT} {number}',
+                                author=cls.author, group=cls.group)
+        cls.post = Post.objects.latest('pub_date', 'id')
+        cls.POST_URL = reverse('api:post',
+                               args=(cls.author.username, cls.post.pk))
+
+    def setUp(self):
+        get_cache().clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_listings(self):
+        """Ленты отдаются страницами по курсору."""
+        urls = (
+            (self.guest_client, API_INDEX_URL),
+            (self.guest_client, reverse('api:group', args=(c.SLUG,))),
+            (self.guest_client, reverse('api:profile',
+                                        args=(self.author.username,))),
+            (self.reader_client, API_FOLLOW_URL),
+        )
+        for client, url in urls:
+            with self.subTest(url=url):
+                data = client.get(url).json()
+                self.assertEqual(len(data['results']), PGR)
+                self.assertEqual(data['results'][0]['id'], self.post.pk)
+                self.assertIsNone(data['previous'])
+                second = client.get(data['next']).json()
+                self.assertEqual(len(second['results']), 2)
+                self.assertIsNone(second['next'])
+
+    def test_post_with_comments(self):
+        """Запись отдаётся вместе с комментариями."""
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text=c.TEXT)
+        data = self.guest_client.get(self.POST_URL).json()
+        self.assertEqual(data['text'], self.post.text)
+        self.assertEqual(data['comments_count'], 1)
+        self.assertEqual(data['comments'][0]['author'], 'PetrBasov')
+        self.assertIsNone(data['next_comments'])
+
+    def test_post_comments_are_paged(self):
+        """Комментарии к записи отдаются страницами по курсору."""
+        for number in range(COMMENTS_PER_PAGE + 1):
+            Comment.objects.create(post=self.post, author=self.reader,
+                                   text=f'{c.TEXT} {number}')
+        data = self.guest_client.get(self.POST_URL).json()
+        self.assertEqual(len(data['comments']), COMMENTS_PER_PAGE)
+        second = self.guest_client.get(data['next_comments']).json()
+        self.assertEqual(len(second['comments']), 1)
+        self.assertIsNone(second['next_comments'])
+        response = self.guest_client.get(self.POST_URL, {'comments': 'xxx'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_not_modified(self):
+        """Неизменившаяся лента отвечает 304 без запросов к базе."""
+        response = self.guest_client.get(API_INDEX_URL)
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(
+                API_INDEX_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text=c.TEXT)
+        response = self.guest_client.get(API_INDEX_URL,
+                                         HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_if_modified_since(self):
+        """Last-Modified берётся из даты последней записи."""
+        response = self.guest_client.get(self.POST_URL)
+        response = self.guest_client.get(
+            self.POST_URL,
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_follow_requires_login(self):
+        """Лента подписок без авторизации отвечает 401."""
+        response = self.guest_client.get(API_FOLLOW_URL)
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('Cookie', response['Vary'])
+
+    def test_invalid_cursor(self):
+        """Испорченный курсор — ошибка 400."""
+        response = self.guest_client.get(API_INDEX_URL, {'cursor': 'xxx'})
+        self.assertEqual(response.status_code, 400)
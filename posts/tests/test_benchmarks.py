@@ -0,0 +1,84 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from posts.benchmarks import compare, load, percentile
+from posts.models import Post
+
+VIEWS = ('index', 'group_posts', 'profile', 'post_view', 'follow_index',
+         'add_comment', 'new_post')
+
+
+class BenchmarksTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory, ignore_errors=True)
+        super().tearDownClass()
+
+    def bench(self, **options):
+        call_command('bench_views', repeat=3, memory_repeat=1, users=20,
+                     posts=100, comments=100, stdout=mock.MagicMock(),
+                     stderr=mock.MagicMock(), **options)
+
+    def test_percentile(self):
+        """Перцентиль считается методом ближайшего ранга."""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.95), 95)
+        self.assertEqual(percentile([7], 0.99), 7)
+
+    def test_compare(self):
+        """Регрессией считается рост запросов и выход за порог."""
+        baseline = {'views': {'index': {
+            'queries': 3, 'p95_ms': 10, 'memory_kb': 100}}}
+        same = {'views': {'index': {
+            'queries': 3, 'p95_ms': 11, 'memory_kb': 100}}}
+        worse = {'views': {'index': {
+            'queries': 4, 'p95_ms': 13, 'memory_kb': 100}}}
+        self.assertEqual(compare(same, baseline, 0.2), [])
+        self.assertEqual(len(compare(worse, baseline, 0.2)), 2)
+
+    def test_load(self):
+        """Нагрузка перебирает адреса по кругу и считает ошибки."""
+        fetched = []
+
+        def fetch(url):
+            fetched.append(url)
+            return 500 if url == '/b' else 200
+
+        result = load(fetch, ['/a', '/b'], concurrency=4, total=10)
+        self.assertEqual(sorted(fetched), ['/a'] * 5 + ['/b'] * 5)
+        self.assertEqual(result['errors'], 5)
+        self.assertGreater(result['rps'], 0)
+
+    def test_command_records_every_view(self):
+        """Команда пишет JSON по всем страницам и откатывает данные."""
+        output = os.path.join(self.directory, 'bench.json')
+        self.bench(output=output)
+        with open(output) as file_:
+            results = json.load(file_)
+        self.assertEqual(tuple(results['views']), VIEWS)
+        for name, metrics in results['views'].items():
+            with self.subTest(view=name):
+                self.assertGreater(metrics['queries'], 0)
+                self.assertLessEqual(metrics['p50_ms'], metrics['p99_ms'])
+        self.assertFalse(Post.objects.exists())
+
+        for metrics in results['views'].values():
+            metrics['queries'] -= 1
+        baseline = os.path.join(self.directory, 'baseline.json')
+        with open(baseline, 'w') as file_:
+            json.dump(results, file_)
+        with self.assertRaises(CommandError):
+            self.bench(baseline=baseline, threshold=100)
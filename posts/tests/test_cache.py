@@ -0,0 +1,124 @@
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.cache import get_cache
+from posts.models import Comment, Post, User
+from . import constants as c
+
+
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='VasiaBasov')
+        cls.reader = User.objects.create_user(username='PetrBasov')
+        cls.post = Post.objects.create(text=c.TEXT, author=cls.author)
+        cls.EDIT_URL = reverse('post_edit', args=(cls.author.username,
+                                                  cls.post.id))
+        cls.POST_URL = reverse('post', args=(cls.author.username,
+                                             cls.post.id))
+
+    def setUp(self):
+        get_cache().clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_index_is_invalidated_by_new_post(self):
+        """Новая запись сразу видна на закешированной главной."""
+        self.guest_client.get(c.INDEX_URL)
+        Post.objects.create(text='Свежая запись', author=self.author)
+        response = self.guest_client.get(c.INDEX_URL)
+        self.assertContains(response, 'Свежая запись')
+
+    def test_edit_button_is_per_user(self):
+        """Кнопка редактирования не попадает в кеш других пользователей."""
+        response = self.author_client.get(c.INDEX_URL)
+        self.assertContains(response, self.EDIT_URL)
+        for client in (self.reader_client, self.guest_client):
+            with self.subTest(client=client):
+                response = client.get(c.INDEX_URL)
+                self.assertNotContains(response, self.EDIT_URL)
+
+    def test_pages_are_cached_separately(self):
+        """Номер страницы входит в ключ кеша."""
+        for number in range(12):
+            Post.objects.create(text=f'Запись {number}', author=self.author)
+        self.guest_client.get(c.INDEX_URL)
+        response = self.guest_client.get(c.INDEX_URL, {'page': 2})
+        self.assertContains(response, c.TEXT)
+
+    def test_post_comments_are_invalidated(self):
+        """Новый комментарий сбрасывает кеш страницы записи."""
+        self.guest_client.get(self.POST_URL)
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Новый комментарий')
+        response = self.guest_client.get(self.POST_URL)
+        self.assertContains(response, 'Новый комментарий')
+
+    def test_conditional_get(self):
+        """Неизменившаяся страница отвечает 304 до рендера."""
+        response = self.guest_client.get(self.POST_URL)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+        etag = response['ETag']
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(self.POST_URL,
+                                             HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text=c.TEXT)
+        response = self.guest_client.get(self.POST_URL,
+                                         HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_conditional_get_is_per_user(self):
+        """Авторизованные получают приватный ответ со своим ETag."""
+        guest = self.guest_client.get(c.INDEX_URL)
+        response = self.reader_client.get(c.INDEX_URL,
+                                          HTTP_IF_NONE_MATCH=guest['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertNotEqual(response['ETag'], guest['ETag'])
+
+    def test_conditional_get_after_relogin(self):
+        """После повторного входа страница с формой приходит с новым
+        CSRF-токеном, а не 304."""
+        self.reader_client.get(self.POST_URL)
+        response = self.reader_client.get(self.POST_URL)
+        etag = response['ETag']
+        self.assertIsNone(response.get('Last-Modified'))
+        response = self.reader_client.get(self.POST_URL,
+                                          HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.reader_client.logout()
+        self.reader_client.force_login(self.reader)
+        self.reader_client.cookies[settings.CSRF_COOKIE_NAME] = 'x' * 64
+        response = self.reader_client.get(self.POST_URL,
+                                          HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'csrfmiddlewaretoken')
+
+    def test_cached_listing_skips_queries(self):
+        """При попадании в кеш фрагмента список записей не читается."""
+        urls = (
+            c.INDEX_URL,
+            reverse('profile', args=(self.author.username,)),
+            reverse('follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.reader_client.get(url)
+                with CaptureQueriesContext(connection) as captured:
+                    response = self.reader_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse([
+                    query['sql'] for query in captured.captured_queries
+                    if 'FROM "posts_post"' in query['sql']
+                    and 'MAX(' not in query['sql']
+                ])
@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+from importlib.util import find_spec
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+
+from posts import cache
+from posts.models import Post, User
+from . import constants as c
+
+BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'posts-tests',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'yatube_test_cache',
+    },
+}
+if os.environ.get('YATUBE_TEST_REDIS') and find_spec('django_redis'):
+    BACKENDS['redis'] = {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': os.environ['YATUBE_TEST_REDIS'],
+    }
+
+
+class CacheBackendsTests(TestCase):
+    """Версионированный кеш posts на каждом поддерживаемом бэкенде."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='VasiaBasov')
+        cls.directory = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory, ignore_errors=True)
+        super().tearDownClass()
+
+    def caches_for(self, name):
+        config = dict(BACKENDS[name])
+        if name == 'file':
+            config['LOCATION'] = os.path.join(self.directory, 'cache')
+        return {
+            'default': {**config, 'KEY_PREFIX': 'yatube'},
+            'posts': {**config, 'KEY_PREFIX': 'yatube:posts',
+                      'VERSION': settings.POSTS_CACHE_VERSION},
+        }
+
+    def run_on_each_backend(self, check):
+        for name in BACKENDS:
+            with self.subTest(backend=name):
+                with override_settings(CACHES=self.caches_for(name)):
+                    if name == 'db':
+                        call_command('createcachetable', verbosity=0)
+                    cache.get_cache().clear()
+                    check()
+
+    def test_bump_changes_version(self):
+        """bump меняет версию области и не трогает остальные."""
+        def check():
+            scope = cache.author_scope(self.author.pk)
+            before, other = cache.versions(scope, cache.POSTS_SCOPE)
+            cache.bump(scope)
+            after, other_after = cache.versions(scope, cache.POSTS_SCOPE)
+            self.assertNotEqual(before, after)
+            self.assertEqual(other, other_after)
+        self.run_on_each_backend(check)
+
+    def test_namespace_is_isolated(self):
+        """Ключи posts не пересекаются с ключами кеша по умолчанию."""
+        def check():
+            caches['default'].set(cache.VERSION_PREFIX + 'posts', 'чужое')
+            self.assertNotEqual(cache.versions(cache.POSTS_SCOPE)[0],
+                                'чужое')
+        self.run_on_each_backend(check)
+
+    def test_index_invalidation(self):
+        """Новая запись видна на главной при любом бэкенде."""
+        def check():
+            client = Client()
+            client.get(c.INDEX_URL)
+            text = f'Запись {Post.objects.count()}'
+            Post.objects.create(text=text, author=self.author)
+            self.assertContains(client.get(c.INDEX_URL), text)
+        self.run_on_each_backend(check)
@@ -0,0 +1,138 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts.cache import get_cache
+from posts.models import Comment, Post, User
+from posts import constants as pc
+from . import constants as c
+
+TOTAL = pc.COMMENTS_PER_PAGE + 5
+
+
+class CommentPagesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='VasiaBasov')
+        cls.reader = User.objects.create_user(username='PetrBasov')
+        cls.post = Post.objects.create(text=c.TEXT, author=cls.author)
+        for number in range(TOTAL):
+            Comment.objects.create(post=cls.post, author=cls.reader,
+                                   text=f'Комментарий {number}')
+        cls.POST_URL = reverse('post', args=(cls.author.username,
+                                             cls.post.pk))
+        cls.COMMENTS_URL = reverse('post_comments',
+                                   args=(cls.author.username, cls.post.pk))
+
+    def setUp(self):
+        get_cache().clear()
+        self.client = Client()
+
+    def test_first_page(self):
+        """На странице записи первая страница комментариев, от старых."""
+        response = self.client.get(self.POST_URL)
+        page = response.context['comments_page']
+        self.assertEqual(len(page), pc.COMMENTS_PER_PAGE)
+        self.assertEqual(page[0].text, 'Комментарий 0')
+        self.assertTrue(page.has_next())
+        self.assertContains(response, 'js-more-comments')
+
+    def test_fragment(self):
+        """Фрагмент отдаёт следующую страницу без карточки записи."""
+        cursor = self.client.get(
+            self.POST_URL).context['comments_page'].next_cursor
+        with self.assertNumQueries(3):
+            response = self.client.get(self.COMMENTS_URL,
+                                       {'comments': cursor})
+        page = response.context['comments_page']
+        self.assertEqual([item.text for item in page],
+                         [f'Комментарий {number}' for number in
+                          range(pc.COMMENTS_PER_PAGE, TOTAL)])
+        self.assertNotContains(response, 'js-more-comments')
+        self.assertNotContains(response, c.TEXT)
+
+    def test_query_count(self):
+        """Авторы комментариев не загружаются по одному."""
+        with self.assertNumQueries(6):
+            self.client.get(self.POST_URL)
+
+    def test_fragment_not_found(self):
+        """Фрагмент чужой записи не отдаётся."""
+        url = reverse('post_comments',
+                      args=(self.reader.username, self.post.pk))
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class CommentThreadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='VasiaBasov')
+        cls.post = Post.objects.create(text=c.TEXT, author=cls.author)
+        cls.POST_URL = reverse('post', args=(cls.author.username,
+                                             cls.post.pk))
+        cls.COMMENT_URL = reverse('add_comment',
+                                  args=(cls.author.username, cls.post.pk))
+
+    def setUp(self):
+        get_cache().clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def reply(self, text, parent=None):
+        self.client.post(self.COMMENT_URL, {
+            'text': text, 'parent': parent.pk if parent else '',
+        })
+        return Comment.objects.get(text=text)
+
+    def test_thread_order(self):
+        """Ответы идут сразу за родителем на любой глубине."""
+        first = self.reply('первый')
+        second = self.reply('второй')
+        answer = self.reply('ответ', first)
+        deep = self.reply('ответ на ответ', answer)
+        self.reply('ответ второму', second)
+        response = self.client.get(self.POST_URL)
+        page = response.context['comments_page']
+        self.assertEqual(
+            [(item.text, item.depth) for item in page],
+            [('первый', 0), ('ответ', 1), ('ответ на ответ', 2),
+             ('второй', 0), ('ответ второму', 1)])
+        self.assertTrue(deep.path.startswith(answer.path))
+        first.refresh_from_db()
+        self.assertEqual(first.replies_count, 1)
+
+    def test_reply_counter_on_delete(self):
+        """Удаление ответа уменьшает счётчик у родителя."""
+        parent = self.reply('родитель')
+        self.reply('ответ', parent).delete()
+        parent.refresh_from_db()
+        self.assertEqual(parent.replies_count, 0)
+
+    def test_foreign_parent(self):
+        """Нельзя ответить на комментарий к другой записи."""
+        other = Post.objects.create(text=c.TEXT, author=self.author)
+        foreign = Comment.objects.create(post=other, author=self.author,
+                                         text='чужой')
+        response = self.client.post(self.COMMENT_URL, {
+            'text': 'ответ', 'parent': foreign.pk,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].non_field_errors())
+        self.assertFalse(Comment.objects.filter(text='ответ').exists())
+
+    def test_max_depth(self):
+        """Глубже предела ответ встаёт рядом с родителем."""
+        parent = None
+        for level in range(pc.COMMENT_MAX_DEPTH + 2):
+            parent = self.reply(f'уровень {level}', parent)
+        self.assertEqual(parent.depth, pc.COMMENT_MAX_DEPTH)
+
+    def test_bulk_inserted_comments(self):
+        """Комментарии из bulk_create получают путь корня."""
+        Comment.objects.bulk_create([
+            Comment(post=self.post, author=self.author, text=c.TEXT)])
+        Comment.objects.fill_paths()
+        comment = Comment.objects.get()
+        self.assertEqual(comment.path,
+                         str(comment.pk).zfill(pc.COMMENT_PATH_STEP))
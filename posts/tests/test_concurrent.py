@@ -0,0 +1,99 @@
+import threading
+
+from django.test import TransactionTestCase, Client, override_settings
+from django.urls import reverse
+
+from posts import concurrent
+from posts.cache import get_cache
+from posts.models import Comment, Post, User
+from posts import constants as pc
+from yatube.metrics import REQUEST_QUERIES
+from yatube.querywrappers import wrap_queries
+from . import constants as c
+
+
+class ConcurrentReadsTests(TransactionTestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.author = User.objects.create_user(username='VasiaBasov')
+        for number in range(pc.PGR + 2):
+            self.post = Post.objects.create(text=f'{c.TEXT} {number}',
+                                            author=self.author)
+
+    def test_gather_is_sequential_by_default(self):
+        """Без настройки функции выполняются в текущем потоке."""
+        threads = concurrent.gather(threading.get_ident,
+                                    threading.get_ident)
+        self.assertEqual(threads, [threading.get_ident()] * 2)
+
+    @override_settings(CONCURRENT_READS=True)
+    def test_gather_keeps_order(self):
+        """Результаты возвращаются в порядке функций."""
+        self.assertEqual(concurrent.gather(lambda: 1, lambda: 2), [1, 2])
+
+    @override_settings(CONCURRENT_READS=True)
+    def test_pages_with_concurrent_reads(self):
+        """Страницы собираются так же, как при последовательном чтении."""
+        urls = (
+            reverse('profile', args=(self.author.username,)),
+            reverse('post', args=(self.author.username, self.post.pk)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = Client().get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, self.post.text)
+        response = Client().get(urls[0])
+        page = response.context['page']
+        self.assertEqual(len(page), pc.PGR)
+        self.assertTrue(page.has_next())
+        missing = reverse('post', args=(self.author.username, 0))
+        self.assertEqual(Client().get(missing).status_code, 404)
+
+    @override_settings(CONCURRENT_READS=True)
+    def test_query_wrappers_reach_pool_threads(self):
+        """Обёртки запросов метрик и профилирования видят потоки пула."""
+        threads = []
+
+        def count(execute, sql, params, many, context):
+            threads.append(threading.get_ident())
+            return execute(sql, params, many, context)
+
+        with wrap_queries(count):
+            concurrent.gather(Post.objects.count, User.objects.count)
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(threading.get_ident(), threads)
+
+    @override_settings(CONCURRENT_READS=True)
+    def test_post_comments_are_read_in_pool(self):
+        """Комментарии к записи читаются в потоке пула, не при рендере."""
+        Comment.objects.create(post=self.post, author=self.author,
+                               text=c.TEXT)
+        url = reverse('post', args=(self.author.username, self.post.pk))
+        threads = []
+
+        def record(execute, sql, params, many, context):
+            if 'FROM "posts_comment"' in sql and '"path"' in sql:
+                threads.append(threading.get_ident())
+            return execute(sql, params, many, context)
+
+        with wrap_queries(record):
+            response = Client().get(url)
+        self.assertContains(response, c.TEXT)
+        self.assertTrue(threads)
+        self.assertNotIn(threading.get_ident(), threads)
+
+    @override_settings(METRICS=True)
+    def test_metrics_count_pool_queries(self):
+        """С параллельным чтением метрики считают те же запросы."""
+        url = reverse('post', args=(self.author.username, self.post.pk))
+        counts = []
+        for enabled in (False, True):
+            with override_settings(CONCURRENT_READS=enabled):
+                get_cache().clear()
+                before = REQUEST_QUERIES.values.get(('post',), {'sum': 0})
+                before = before['sum']
+                Client().get(url)
+                counts.append(REQUEST_QUERIES.values[('post',)]['sum']
+                              - before)
+        self.assertEqual(counts[0], counts[1])
@@ -0,0 +1,51 @@
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import Comment, Follow, Post, User, UserStats
+from . import constants as c
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='VasiaBasov')
+        cls.reader = User.objects.create_user(username='PetrBasov')
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются вместе с записями, комментариями и подписками."""
+        post = Post.objects.create(text=c.TEXT, author=self.author)
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text=c.TEXT)
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+
+        comment.delete()
+        follow.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+        post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+
+    def test_recount_repairs_drift(self):
+        """Команда recount исправляет разошедшиеся счётчики."""
+        post = Post.objects.create(text=c.TEXT, author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text=c.TEXT)
+        UserStats.objects.update(posts_count=42)
+        Post.objects.update(comments_count=42)
+        call_command('recount', stdout=mock.MagicMock())
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.reader).posts_count, 0)
@@ -0,0 +1,75 @@
+import io
+import json
+import shutil
+import tempfile
+import zipfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, User
+from . import constants as c
+
+MEDIA_ROOT = tempfile.mkdtemp()
+EXPORT_URL = reverse('export')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='VasiaBasov')
+        cls.other = User.objects.create_user(username='PetrBasov')
+        cls.post = Post.objects.create(
+            text=c.TEXT,
+            author=cls.user,
+            image=SimpleUploadedFile('small.gif', c.SMALL_GIF,
+                                     content_type='image/gif'),
+        )
+        Post.objects.create(text='Чужая запись', author=cls.other)
+        Comment.objects.create(post=cls.post, author=cls.user, text='Мой')
+        Follow.objects.create(user=cls.user, author=cls.other)
+        Follow.objects.create(user=cls.other, author=cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def records(self, content):
+        return [json.loads(line) for line in content.decode().splitlines()]
+
+    def test_ndjson(self):
+        """NDJSON содержит только данные пользователя."""
+        response = self.client.get(EXPORT_URL, {'format': 'ndjson'})
+        self.assertTrue(response.streaming)
+        records = self.records(b''.join(response.streaming_content))
+        self.assertEqual([record['type'] for record in records],
+                         ['post', 'comment', 'following', 'follower'])
+        self.assertEqual(records[0]['text'], c.TEXT)
+        self.assertEqual(records[2]['author__username'], 'PetrBasov')
+
+    def test_zip(self):
+        """ZIP содержит строки данных и оригиналы картинок."""
+        response = self.client.get(EXPORT_URL)
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment', response['Content-Disposition'])
+        content = b''.join(response.streaming_content)
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            records = self.records(archive.read('data.ndjson'))
+            image = archive.read(f'images/{self.post.image.name}')
+        self.assertEqual(len(records), 4)
+        self.assertEqual(image, c.SMALL_GIF)
+
+    def test_access(self):
+        """Гость уходит на вход, неизвестный формат не найден."""
+        response = Client().get(EXPORT_URL)
+        self.assertEqual(response.status_code, 302)
+        response = self.client.get(EXPORT_URL, {'format': 'xml'})
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,112 @@
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts import constants as pc
+from posts.feed import FeedPaginator
+from posts.models import FeedEntry, Follow, Post, User
+from . import constants as c
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='VasiaBasov')
+        cls.reader = User.objects.create_user(username='PetrBasov')
+        cls.FOLLOW_URL = reverse('follow_index')
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        """Новая запись раскладывается в ленты подписчиков."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text=c.TEXT, author=self.author)
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        response = self.reader_client.get(self.FOLLOW_URL)
+        self.assertIn(post, response.context['page'])
+
+    def test_follow_and_unfollow_update_feed(self):
+        """Подписка добавляет записи автора в ленту, отписка удаляет."""
+        post = Post.objects.create(text=c.TEXT, author=self.author)
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        follow.delete()
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+
+    @mock.patch('posts.constants.FEED_FANOUT_LIMIT', 0)
+    def test_heavy_author_is_pulled_on_read(self):
+        """Записи популярного автора не раскладываются, а читаются из Post."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text=c.TEXT, author=self.author)
+        self.assertFalse(FeedEntry.objects.exists())
+        response = self.reader_client.get(self.FOLLOW_URL)
+        self.assertIn(post, response.context['page'])
+
+    @mock.patch('posts.constants.FEED_FANOUT_LIMIT', 1)
+    def test_heavy_and_pushed_posts_are_merged_by_date(self):
+        """Страницы ленты сливают разложенные записи и записи популярного
+        автора в порядке даты."""
+        light = User.objects.create_user(username='IvanBasov')
+        other = User.objects.create_user(username='OlegBasov')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        Follow.objects.create(user=self.reader, author=light)
+        for number in range(pc.PGR + 3):
+            Post.objects.create(text=c.TEXT,
+                                author=(self.author, light)[number % 2])
+        paginator = FeedPaginator(self.reader)
+        page = paginator.get_page(None)
+        seen = list(page)
+        while page.next_cursor:
+            page = paginator.get_page(page.next_cursor)
+            seen.extend(page)
+        expected = list(Post.objects.filter(
+            author__in=(self.author, light)).order_by('-pub_date', '-id'))
+        self.assertEqual(seen, expected)
+        previous = paginator.get_page(page.previous_cursor)
+        self.assertEqual(list(previous), expected[:pc.PGR])
+
+    @mock.patch('posts.constants.FEED_LIGHT_LIMIT', 0)
+    @mock.patch('posts.constants.FEED_FANOUT_LIMIT', 1)
+    def test_light_author_is_restored_by_command(self):
+        """Отписка не раскладывает записи в запросе: автор остаётся в
+        hybrid pull, пока команда не вернёт его к раскладке ниже
+        FEED_LIGHT_LIMIT."""
+        other = User.objects.create_user(username='OlegBasov')
+        Follow.objects.create(user=self.reader, author=self.author)
+        follow = Follow.objects.create(user=other, author=self.author)
+        post = Post.objects.create(text=c.TEXT, author=self.author)
+        follow.delete()
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        response = self.reader_client.get(self.FOLLOW_URL)
+        self.assertIn(post, response.context['page'])
+        # Один подписчик — между порогами: раскладки нет.
+        call_command('backfill_feed', '--light-authors',
+                     stdout=mock.MagicMock())
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        with mock.patch('posts.constants.FEED_LIGHT_LIMIT', 1):
+            call_command('backfill_feed', '--light-authors',
+                         stdout=mock.MagicMock())
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        self.author.stats.refresh_from_db()
+        self.assertFalse(self.author.stats.feed_pull)
+        fresh = Post.objects.create(text=c.TEXT, author=self.author)
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.reader, post=fresh).exists())
+
+    def test_backfill_command(self):
+        """Команда backfill_feed восстанавливает ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text=c.TEXT, author=self.author)
+        FeedEntry.objects.all().delete()
+        call_command('backfill_feed', stdout=mock.MagicMock())
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.reader, post=post).exists())
@@ -0,0 +1,128 @@
+import datetime as dt
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import hot, moderation
+from posts.cache import get_cache
+from posts.models import Comment, Post, PostScore, User
+from posts import constants as pc
+from . import constants as c
+
+HALF_LIFE = dt.timedelta(seconds=pc.HOT_HALF_LIFE)
+
+
+class HotPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='VasiaBasov')
+        cls.reader = User.objects.create_user(username='PetrBasov')
+
+    def setUp(self):
+        get_cache().clear()
+        self.old = Post.objects.create(author=self.author,
+                                       text='старая запись')
+        self.new = Post.objects.create(author=self.author,
+                                       text='новая запись')
+        self.now = timezone.now()
+
+    def score(self, post):
+        return PostScore.objects.get(post=post)
+
+    def test_scores_created_with_posts(self):
+        """Новая запись сразу получает оценку по весу публикации."""
+        self.assertAlmostEqual(self.score(self.new).score,
+                               hot.post_weight(0))
+
+    def test_comments_decay(self):
+        """Комментарий добавляет вес, который вдвое падает за период."""
+        at = self.score(self.old).updated + HALF_LIFE
+        hot.add_comments({self.old.pk: 1}, at)
+        score = self.score(self.old)
+        self.assertAlmostEqual(score.score, hot.post_weight(0) / 2 + 1)
+        self.assertAlmostEqual(score.rank, hot.rank_of(score.score, at))
+
+    def test_decay_keeps_order(self):
+        """decay_scores пересчитывает оценки, не меняя ранги."""
+        hot.add_comments({self.old.pk: 3}, self.now)
+        ranks = dict(PostScore.objects.values_list('post_id', 'rank'))
+        hot.decay(self.now + HALF_LIFE)
+        for score in PostScore.objects.all():
+            with self.subTest(post=score.post_id):
+                self.assertAlmostEqual(score.rank, ranks[score.post_id])
+                self.assertAlmostEqual(
+                    score.score,
+                    hot.decayed(1, self.now, self.now + HALF_LIFE)
+                    * (4 if score.post_id == self.old.pk else 1), places=3)
+
+    def test_decay_removes_cold(self):
+        """Остывшие записи удаляются из таблицы оценок."""
+        call_command('decay_scores', stdout=StringIO())
+        self.assertEqual(PostScore.objects.count(), 2)
+        updated, deleted = hot.decay(self.now + HALF_LIFE * 10)
+        self.assertEqual((updated, deleted), (0, 2))
+
+    def test_rebuild(self):
+        """Пересчёт с нуля совпадает с накопленными оценками."""
+        Comment.objects.create(post=self.old, author=self.reader,
+                               text=c.TEXT)
+        expected = {score.post_id: score for score in PostScore.objects.all()}
+        at = max(score.updated for score in expected.values())
+        self.assertEqual(hot.rebuild(at), 2)
+        for post_id, score in PostScore.objects.values_list('post_id',
+                                                            'score'):
+            with self.subTest(post=post_id):
+                before = expected[post_id]
+                self.assertAlmostEqual(
+                    score, hot.decayed(before.score, before.updated, at),
+                    places=3)
+
+    def test_hot_page(self):
+        """Запись с комментариями поднимается выше более новой."""
+        response = Client().get(c.HOT_URL)
+        self.assertEqual(list(response.context['page']),
+                         [self.new, self.old])
+        client = Client()
+        client.force_login(self.reader)
+        client.post(reverse('add_comment',
+                            args=(self.author.username, self.old.pk)),
+                    {'text': c.TEXT})
+        response = Client().get(c.HOT_URL)
+        self.assertEqual(list(response.context['page']),
+                         [self.old, self.new])
+        self.assertContains(response, 'старая запись')
+
+    def test_hot_page_queries(self):
+        """Страница читает индекс оценок, а не агрегирует комментарии."""
+        with CaptureQueriesContext(connection) as queries:
+            Client().get(c.HOT_URL)
+        self.assertEqual(len(queries), 3)
+        for query in queries:
+            self.assertNotIn('COUNT(', query['sql'])
+            self.assertNotIn('OFFSET', query['sql'])
+
+    def test_hot_page_cursor(self):
+        """Страницы /hot/ идут по курсору (rank, post_id) без пропусков."""
+        for number in range(pc.PGR + 2):
+            Post.objects.create(author=self.author, text=c.TEXT)
+        expected = [score.post for score in
+                    PostScore.objects.order_by('-rank', '-post_id')]
+        client = Client()
+        response = client.get(c.HOT_URL)
+        seen = list(response.context['page'])
+        cursor = response.context['cursor_page'].next_cursor
+        response = client.get(c.HOT_URL, {'cursor': cursor})
+        seen.extend(response.context['page'])
+        self.assertEqual(seen, expected)
+        self.assertIsNone(response.context['cursor_page'].next_cursor)
+
+    def test_moderation_deletes_scores(self):
+        """Массовое удаление записей убирает и их оценки."""
+        moderation.delete_author_posts([self.author.pk])
+        self.assertFalse(PostScore.objects.exists())
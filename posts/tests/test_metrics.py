@@ -0,0 +1,157 @@
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from unittest import mock
+
+from django.test import TestCase, Client, override_settings
+
+from posts.cache import get_cache
+from posts.models import Comment, Post, User
+from yatube.metrics import REGISTRY, merge
+from . import constants as c
+
+METRICS_URL = '/metrics'
+
+
+def value(name, **labels):
+    metric = REGISTRY.snapshot()[name]
+    key = [str(labels[label]) for label in metric['labels']]
+    for labels_, current in metric['values']:
+        if labels_ == key:
+            return current
+    return 0
+
+
+@override_settings(METRICS=True)
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='VasiaBasov')
+        cls.post = Post.objects.create(text=c.TEXT, author=cls.author)
+
+    def setUp(self):
+        get_cache().clear()
+
+    def test_endpoint(self):
+        """/metrics отдаёт задержку и число запросов по имени URL."""
+        before = value('yatube_request_queries', view='index') or {'count': 0}
+        Client().get(c.INDEX_URL)
+        response = Client().get(METRICS_URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        text = response.content.decode()
+        self.assertIn('# TYPE yatube_request_duration_seconds histogram',
+                      text)
+        self.assertIn('yatube_request_duration_seconds_bucket'
+                      '{view="index",le="+Inf"}', text)
+        after = value('yatube_request_queries', view='index')
+        self.assertEqual(after['count'], before['count'] + 1)
+        self.assertGreater(after['sum'], 0)
+
+    def test_template_cache(self):
+        """Кеш фрагментов считает промах, а затем попадание."""
+        labels = {'fragment': 'index_page'}
+        misses = value('yatube_template_cache_total', result='miss', **labels)
+        hits = value('yatube_template_cache_total', result='hit', **labels)
+        client = Client()
+        client.get(c.INDEX_URL)
+        client.get(c.INDEX_URL)
+        self.assertEqual(
+            value('yatube_template_cache_total', result='miss', **labels),
+            misses + 1)
+        self.assertEqual(
+            value('yatube_template_cache_total', result='hit', **labels),
+            hits + 1)
+
+    def test_writes(self):
+        """Создание записи и комментария увеличивает счётчики."""
+        posts = value('yatube_writes_total', model='post')
+        comments = value('yatube_writes_total', model='comment')
+        Post.objects.create(text=c.TEXT, author=self.author)
+        Comment.objects.create(text=c.TEXT, author=self.author,
+                               post=self.post)
+        self.post.save()
+        self.assertEqual(value('yatube_writes_total', model='post'),
+                         posts + 1)
+        self.assertEqual(value('yatube_writes_total', model='comment'),
+                         comments + 1)
+
+    def metrics_dir(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        return directory
+
+    def test_multiprocess(self):
+        """В режиме каталога /metrics складывает снимки живых процессов."""
+        directory = self.metrics_dir()
+        Post.objects.create(text=c.TEXT, author=self.author)
+        current = value('yatube_writes_total', model='post')
+        # Снимок другого воркера gunicorn.
+        with open(os.path.join(directory, f'{os.getppid()}-other.json'),
+                  'w') as file_:
+            json.dump(REGISTRY.snapshot(), file_)
+        with override_settings(METRICS_DIR=directory):
+            text = Client().get(METRICS_URL).content.decode()
+        self.assertIn(f'yatube_writes_total{{model="post"}} {current * 2}',
+                      text)
+        self.assertIn(REGISTRY.filename(), os.listdir(directory))
+
+    def test_dead_process_files_are_pruned(self):
+        """Файлы завершившихся процессов удаляются и не суммируются."""
+        directory = self.metrics_dir()
+        Post.objects.create(text=c.TEXT, author=self.author)
+        current = value('yatube_writes_total', model='post')
+        process = subprocess.Popen(['true'])
+        process.wait()
+        stale = [f'{process.pid}-old.json', f'{os.getpid()}-old.json']
+        for name in stale:
+            with open(os.path.join(directory, name), 'w') as file_:
+                json.dump(REGISTRY.snapshot(), file_)
+        with override_settings(METRICS_DIR=directory):
+            text = Client().get(METRICS_URL).content.decode()
+        self.assertIn(f'yatube_writes_total{{model="post"}} {current}\n',
+                      text)
+        self.assertEqual(os.listdir(directory), [REGISTRY.filename()])
+
+    def test_flush_is_off_request_path(self):
+        """Снимок пишет фоновый поток, а не обработчик запроса."""
+        directory = self.metrics_dir()
+        with override_settings(METRICS_DIR=directory,
+                               METRICS_FLUSH_INTERVAL=0.01):
+            with mock.patch.object(REGISTRY, 'flush') as flush:
+                with mock.patch.object(REGISTRY, 'flusher', None):
+                    Client().get(c.INDEX_URL)
+                    flusher = REGISTRY.flusher
+            flush.assert_not_called()
+            deadline = time.monotonic() + 5
+            while (REGISTRY.filename() not in os.listdir(directory)
+                   and time.monotonic() < deadline):
+                time.sleep(0.01)
+        self.assertTrue(flusher.daemon)
+        self.assertIn(REGISTRY.filename(), os.listdir(directory))
+
+    def test_access(self):
+        """/metrics закрыт для чужих адресов без токена."""
+        with override_settings(METRICS_ALLOWED_IPS=[],
+                               METRICS_TOKEN='secret'):
+            self.assertEqual(Client().get(METRICS_URL).status_code, 403)
+            response = Client().get(METRICS_URL,
+                                    HTTP_AUTHORIZATION='Bearer secret')
+            self.assertEqual(response.status_code, 200)
+        with override_settings(METRICS=False):
+            self.assertEqual(Client().get(METRICS_URL).status_code, 404)
+
+    def test_merge_histograms(self):
+        """Гистограммы разных процессов складываются по корзинам."""
+        snapshot = {'h': {
+            'type': 'histogram', 'help': '', 'labels': [],
+            'buckets': [1],
+            'values': [[[], {'buckets': [1, 2], 'sum': 5, 'count': 3}]],
+        }}
+        merged = merge([snapshot, snapshot])
+        self.assertEqual(merged['h']['values'],
+                         [[[], {'buckets': [2, 4], 'sum': 10, 'count': 6}]])
@@ -0,0 +1,116 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.cache import get_cache
+from posts.models import Post, User
+from posts.pagination import (CursorPaginator, CursorPage,
+                              EstimatedCountPaginator, estimated_count)
+from . import constants as c
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='VasiaBasov')
+        for number in range(25):
+            Post.objects.create(text=f'{c.TEXT} {number}', author=cls.user)
+        cls.expected = list(Post.objects.order_by('-pub_date', '-id'))
+
+    def test_walk_forward_and_back(self):
+        """Курсоры обходят все записи вперёд и назад без пропусков."""
+        paginator = CursorPaginator(Post.objects.all(), c.PER_PAGE)
+        page = paginator.get_page()
+        seen = list(page)
+        while page.next_cursor:
+            page = paginator.get_page(page.next_cursor)
+            seen.extend(page)
+        self.assertEqual(seen, self.expected)
+        self.assertFalse(page.has_next())
+
+        seen = list(page)
+        while page.previous_cursor:
+            page = paginator.get_page(page.previous_cursor)
+            seen = list(page) + seen
+        self.assertEqual(seen, self.expected)
+        self.assertFalse(page.has_previous())
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Испорченный курсор открывает первую страницу."""
+        paginator = CursorPaginator(Post.objects.all(), c.PER_PAGE)
+        page = paginator.get_page('garbage')
+        self.assertEqual(list(page), self.expected[:c.PER_PAGE])
+
+    def test_profile_follows_cursor_links(self):
+        """Профиль переходит на keyset-страницы по ?cursor=."""
+        client = Client()
+        profile_url = reverse('profile', args=(self.user.username,))
+        response = client.get(profile_url)
+        next_cursor = response.context['cursor_page'].next_cursor
+        self.assertIsNotNone(next_cursor)
+        response = client.get(profile_url, {'cursor': next_cursor})
+        page = response.context['page']
+        self.assertIsInstance(page, CursorPage)
+        self.assertEqual(list(page), self.expected[10:20])
+        self.assertContains(response, f'Записей: ~{len(self.expected)}')
+        self.assertContains(response, f'?cursor={page.next_cursor}')
+
+    def test_first_page_without_count(self):
+        """Первая страница читается без COUNT(*) и OFFSET."""
+        get_cache().clear()
+        client = Client()
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(c.INDEX_URL)
+        self.assertTrue(response.context['page'].has_next())
+        self.assertFalse(any('COUNT(' in query['sql']
+                             for query in captured.captured_queries))
+        self.assertFalse(any('OFFSET' in query['sql']
+                             for query in captured.captured_queries))
+
+    def test_legacy_page_number(self):
+        """Старая ссылка ?page=N открывает ту же страницу с курсорами."""
+        response = Client().get(c.INDEX_URL, {'page': 2})
+        page = response.context['cursor_page']
+        self.assertEqual(list(page), self.expected[10:20])
+        self.assertTrue(page.has_previous())
+        response = Client().get(c.INDEX_URL, {'cursor': page.next_cursor})
+        self.assertEqual(list(response.context['page']), self.expected[20:])
+
+    def test_deep_legacy_page_opens_first(self):
+        """Слишком дальний ?page=N открывает первую страницу без OFFSET."""
+        for url in (c.INDEX_URL, c.FOLLOW_URL, c.HOT_URL):
+            with self.subTest(url=url):
+                client = Client()
+                client.force_login(self.user)
+                with CaptureQueriesContext(connection) as captured:
+                    response = client.get(url, {'page': 100000})
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(response.context['cursor_page'].offset)
+                self.assertFalse(any('OFFSET' in query['sql']
+                                     for query in captured.captured_queries))
+
+    def test_estimated_count_without_count(self):
+        """Оценка числа записей берётся из статистики, а не из COUNT(*)."""
+        posts = Post.objects.all()
+        with CaptureQueriesContext(connection) as captured:
+            self.assertGreaterEqual(estimated_count(posts), len(self.expected))
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            self.assertEqual(estimated_count(posts), len(self.expected))
+            self.assertIsNone(estimated_count(
+                posts.filter(author=self.user)))
+            self.assertIsNone(estimated_count(
+                posts.filter(text__contains=c.TEXT)))
+        self.assertFalse(any('COUNT(' in query['sql']
+                             for query in captured.captured_queries))
+
+    def test_admin_count_is_bounded(self):
+        """Без оценки админка считает не больше COUNT_SCAN_LIMIT строк."""
+        posts = Post.objects.filter(text__contains=c.TEXT).order_by('pk')
+        with mock.patch('posts.constants.COUNT_SCAN_LIMIT', 5):
+            paginator = EstimatedCountPaginator(posts, c.PER_PAGE)
+            self.assertEqual(paginator.count, 5)
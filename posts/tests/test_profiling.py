@@ -0,0 +1,69 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+
+from posts.cache import get_cache
+from posts.models import Post, User
+from . import constants as c
+
+
+@override_settings(PROFILING=True, PROFILING_SAMPLE_RATE=1)
+class ProfilingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='VasiaBasov')
+        Post.objects.create(text=c.TEXT, author=cls.author)
+        cls.directory = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        get_cache().clear()
+        self.log = os.path.join(self.directory, 'profile.log')
+        logger = logging.getLogger('yatube.profiling')
+        for configured in logger.handlers[:]:
+            logger.removeHandler(configured)
+            self.addCleanup(logger.addHandler, configured)
+        handler = logging.FileHandler(self.log)
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+        self.addCleanup(handler.close)
+
+    def test_log_stays_out_of_checkout(self):
+        """Тесты пишут лог профилирования только во временный каталог."""
+        Client().get(c.INDEX_URL)
+        self.assertFalse(os.path.exists(
+            os.path.join(settings.BASE_DIR, 'profile.log')))
+
+    def test_server_timing(self):
+        """Ответ содержит время SQL и шаблонов, запрос попадает в лог."""
+        response = Client().get(c.INDEX_URL)
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('tpl-post_item.html', timing)
+        with open(self.log) as file_:
+            record = json.loads(file_.readlines()[-1])
+        self.assertEqual(record['view'], 'index')
+        self.assertGreater(record['sql_count'], 0)
+        self.assertIn('post_item.html', record['templates'])
+
+    def test_report(self):
+        """profile_report показывает страницы и их шаблоны."""
+        client = Client()
+        for _ in range(3):
+            client.get(c.INDEX_URL)
+        output = StringIO()
+        call_command('profile_report', log=self.log, stdout=output)
+        self.assertIn('index: p95', output.getvalue())
+        self.assertIn('index.html', output.getvalue())
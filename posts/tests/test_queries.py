@@ -0,0 +1,58 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts.cache import get_cache
+from posts.models import Comment, Follow, Group, Post, User
+from . import constants as c
+
+
+class ListingQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='VasiaBasov')
+        cls.reader = User.objects.create_user(username='PetrBasov')
+        cls.group = Group.objects.create(
+            title=c.TITLE,
+            slug=c.SLUG,
+            description=c.DESCRIPTION,
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for number in range(12):
+            post = Post.objects.create(
+                text=f'{c.TEXT} {number}',
+                author=cls.author,
+                group=cls.group,
+            )
+            Comment.objects.create(post=post, author=cls.reader, text=c.TEXT)
+        cls.PROFILE_URL = reverse('profile', args=(cls.author.username,))
+        cls.FOLLOW_URL = reverse('follow_index')
+
+    def setUp(self):
+        get_cache().clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_listing_query_count(self):
+        """Число запросов страницы не зависит от числа записей на ней."""
+        # Включая валидаторы условного GET: поиск области и Last-Modified
+        # (его авторизованным не считают).
+        expected_queries = (
+            (self.guest_client, c.INDEX_URL, 4),
+            (self.guest_client, c.GROUP_URL, 6),
+            (self.guest_client, self.PROFILE_URL, 6),
+            (self.reader_client, self.FOLLOW_URL, 8),
+        )
+        for client, url, queries in expected_queries:
+            with self.subTest(url=url):
+                with self.assertNumQueries(queries):
+                    response = client.get(url)
+                self.assertEqual(len(response.context['page']), 10)
+
+    def test_comment_count_is_denormalized(self):
+        """Число комментариев выводится без отдельного запроса."""
+        response = self.guest_client.get(self.PROFILE_URL)
+        post = response.context['page'][0]
+        self.assertEqual(post.comments_count, 1)
+        self.assertContains(response, 'Комментариев: 1')
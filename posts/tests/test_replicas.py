@@ -0,0 +1,191 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.contrib.sessions.models import Session
+from django.db import connections
+from django.http import HttpResponse
+from django.test import (TestCase, TransactionTestCase, Client,
+                         RequestFactory, override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import replicas
+from posts.cache import get_cache
+from posts.models import Post, User
+from . import constants as c
+
+
+def routed_view(request):
+    router = replicas.ReplicaRouter()
+    return HttpResponse(' '.join((
+        router.db_for_read(Post),
+        router.db_for_read(Session),
+        router.db_for_write(Post),
+    )))
+
+
+class ReplicaRouterTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.view = replicas.replica_reads(routed_view)
+
+    def route(self, request):
+        return self.view(request).content.decode().split()
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        """Без реплик всё идёт в default."""
+        self.assertEqual(self.route(self.factory.get('/')),
+                         ['default', 'default', 'default'])
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_reads_in_view(self):
+        """Чтения ленты идут на реплику, сессии и записи — в default."""
+        self.assertEqual(self.route(self.factory.get('/')),
+                         ['replica1', 'default', 'default'])
+        self.assertEqual(replicas.ReplicaRouter().db_for_read(Post),
+                         'default')
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_unsafe_method(self):
+        """POST читает основную базу."""
+        self.assertEqual(self.route(self.factory.post('/'))[0], 'default')
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_sticky_session(self):
+        """После записи сессия читает основную базу до конца срока."""
+        request = self.factory.get('/')
+        request.COOKIES[settings.SESSION_COOKIE_NAME] = 'key'
+        for until, expected in ((time.time() + 60, 'default'),
+                                (time.time() - 1, 'replica1')):
+            with self.subTest(until=until):
+                request.session = {replicas.STICKY_SESSION_KEY: until}
+                self.assertEqual(self.route(request)[0], expected)
+
+
+# Реплика-алиас 'default' проверяет весь путь запроса без второй базы.
+@override_settings(DATABASE_REPLICAS=['default'])
+class StickyWritesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='VasiaBasov')
+        cls.post = Post.objects.create(text=c.TEXT, author=cls.user)
+
+    def setUp(self):
+        get_cache().clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def sticky_until(self):
+        return self.client.session.get(replicas.STICKY_SESSION_KEY, 0)
+
+    def test_read_is_not_sticky(self):
+        """Чтение страницы не делает сессию «липкой»."""
+        self.client.get(reverse('index'))
+        self.assertEqual(self.sticky_until(), 0)
+
+    def test_write_is_sticky(self):
+        """После комментария сессия читает основную базу."""
+        self.client.post(
+            reverse('add_comment', args=(self.user.username, self.post.pk)),
+            {'text': 'комментарий'})
+        self.assertGreater(self.sticky_until(), time.time())
+
+
+REPLICA = 'replica_test'
+
+
+class ReplicaReadsTests(TransactionTestCase):
+    """Реплика — отдельный файл SQLite, который заполняет sync_replicas."""
+    databases = {'default', REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        connections.databases[REPLICA] = {
+            **connections.databases['default'],
+            'NAME': os.path.join(cls.directory, 'replica.sqlite3'),
+            'TEST': {},
+        }
+        cls.replicas = override_settings(DATABASE_REPLICAS=[REPLICA])
+        cls.replicas.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.replicas.disable()
+        connections[REPLICA].close()
+        del connections.databases[REPLICA]
+        delattr(connections._connections, REPLICA)
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def setUp(self):
+        get_cache().clear()
+        self.replica = connections[REPLICA]
+        self.user = User.objects.create_user(username='VasiaBasov')
+        self.post = Post.objects.create(text=c.TEXT, author=self.user)
+        self.sync()
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.POST_URL = reverse('post', args=(self.user.username,
+                                              self.post.pk))
+
+    def sync(self):
+        call_command('sync_replicas', stdout=StringIO())
+
+    def test_reads_then_sticky(self):
+        """Страница читает реплику, после своей записи — основную базу."""
+        with CaptureQueriesContext(self.replica) as captured:
+            response = self.client.get(self.POST_URL)
+        self.assertContains(response, c.TEXT)
+        self.assertTrue(captured)
+        self.client.post(
+            reverse('add_comment', args=(self.user.username, self.post.pk)),
+            {'text': 'свежий комментарий'})
+        get_cache().clear()
+        with CaptureQueriesContext(self.replica) as captured:
+            response = self.client.get(self.POST_URL)
+        self.assertContains(response, 'свежий комментарий')
+        self.assertFalse(captured)
+
+    def test_lagging_replica_is_cached_separately(self):
+        """Страница с отстающей реплики не затирает кеш основной базы и
+        живёт в кешах не дольше REPLICA_CACHE_SECONDS."""
+        Post.objects.create(text='Свежая запись', author=self.user)
+        # Реплика ещё не получила свежую запись, а версии уже новые.
+        response = Client().get(c.INDEX_URL)
+        self.assertNotContains(response, 'Свежая запись')
+        self.assertIn(f's-maxage={int(settings.REPLICA_CACHE_SECONDS)}',
+                      response['Cache-Control'])
+        etag = response['ETag']
+        with CaptureQueriesContext(self.replica) as captured:
+            response = Client().get(c.INDEX_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(captured)
+        with override_settings(DATABASE_REPLICAS=[]):
+            response = Client().get(c.INDEX_URL)
+        self.assertContains(response, 'Свежая запись')
+        self.assertNotEqual(response['ETag'], etag)
+        self.sync()
+        with mock.patch('posts.replicas.time.time',
+                        return_value=time.time()
+                        + settings.REPLICA_CACHE_SECONDS):
+            response = Client().get(c.INDEX_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Свежая запись')
+
+    def test_replica_pages_fill_cache(self):
+        """Анонимные страницы с реплики кешируются и отвечают 304."""
+        response = Client().get(c.INDEX_URL)
+        self.assertIn('public', response['Cache-Control'])
+        # Только агрегат для Last-Modified, список — из кеша фрагмента.
+        with self.assertNumQueries(1, using=REPLICA):
+            response = Client().get(c.INDEX_URL)
+        self.assertContains(response, c.TEXT)
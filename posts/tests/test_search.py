@@ -0,0 +1,81 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts import search
+from posts.constants import PGR
+from posts.models import Group, Post, User
+from . import constants as c
+
+SEARCH_URL = reverse('search')
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='VasiaBasov')
+        cls.other = User.objects.create_user(username='PetrBasov')
+        cls.group = Group.objects.create(
+            title=c.TITLE,
+            slug=c.SLUG,
+            description=c.DESCRIPTION,
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.rare = Post.objects.create(
+            text='Котики и собаки', author=self.author, group=self.group)
+        self.often = Post.objects.create(
+            text='Котики, котики, котики', author=self.other)
+        Post.objects.create(text='Про собак', author=self.author)
+
+    def found(self, **params):
+        response = self.guest_client.get(SEARCH_URL, params)
+        return list(response.context['page'])
+
+    def test_ranking(self):
+        """Запись, где слово встречается чаще, выше в выдаче."""
+        self.assertEqual(self.found(q='Котики'), [self.often, self.rare])
+
+    def test_filters(self):
+        """Выдачу можно ограничить группой и автором."""
+        self.assertEqual(self.found(q='котики', group=c.SLUG), [self.rare])
+        self.assertEqual(self.found(q='котики', author='PetrBasov'),
+                         [self.often])
+        self.assertEqual(self.found(q='котики', author='nobody'), [])
+
+    def test_index_follows_writes(self):
+        """Индекс обновляется при изменении и удалении записи."""
+        self.rare.text = 'Ёжики'
+        self.rare.save()
+        self.assertEqual(self.found(q='котики собаки'), [])
+        self.assertEqual(self.found(q='ёжики'), [self.rare])
+        self.often.delete()
+        self.assertEqual(self.found(q='котики'), [])
+
+    def test_paging(self):
+        """Результаты поиска разбиты на страницы."""
+        Post.objects.bulk_create(
+            Post(text='котики', author=self.author) for _ in range(PGR))
+        search.get_backend().rebuild()
+        response = self.guest_client.get(SEARCH_URL, {'q': 'котики'})
+        self.assertEqual(response.context['paginator'].count, PGR + 2)
+        self.assertContains(response, 'q=%D0%BA')
+
+    def test_fallback_backend(self):
+        """Обратный индекс на Python находит то же, что и FTS5."""
+        backend = search.InvertedIndexBackend()
+        backend.rebuild()
+        found = list(backend.search(search.tokenize('котики')))
+        self.assertEqual(found, [self.often, self.rare])
+
+    def test_admin_uses_index(self):
+        """Поиск в админке идёт через тот же индекс."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        client = Client()
+        client.force_login(admin)
+        response = client.get(reverse('admin:posts_post_changelist'),
+                              {'q': 'собаки'})
+        self.assertEqual(list(response.context['cl'].result_list),
+                         [self.rare])
@@ -0,0 +1,49 @@
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import (Comment, FeedEntry, Follow, Group, Post, User,
+                          UserStats)
+
+SIZES = {'users': 30, 'groups': 3, 'posts': 200, 'comments': 300,
+         'follows': 5}
+
+
+class SeedTests(TestCase):
+    def seed(self, **options):
+        call_command('seed', stdout=mock.MagicMock(), **SIZES, **options)
+
+    def snapshot(self):
+        names = dict(User.objects.values_list('pk', 'username'))
+        return {
+            'posts': [
+                (names[author], text, pub_date)
+                for author, text, pub_date in Post.objects.order_by(
+                    'pk').values_list('author', 'text', 'pub_date')
+            ],
+            'follows': sorted(
+                (names[user], names[author]) for user, author
+                in Follow.objects.values_list('user', 'author')),
+            'comments': Comment.objects.count(),
+        }
+
+    def test_seed_is_deterministic(self):
+        """Один и тот же seed даёт одинаковые данные."""
+        self.seed(seed=7, skip_derived=True)
+        first = self.snapshot()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        self.seed(seed=7, skip_derived=True)
+        self.assertEqual(self.snapshot(), first)
+        self.assertEqual(len(first['posts']), SIZES['posts'])
+        self.assertEqual(first['comments'], SIZES['comments'])
+
+    def test_seed_is_skewed(self):
+        """Подписчики и записи распределены неравномерно."""
+        self.seed()
+        stats = list(UserStats.objects.order_by('-followers_count')
+                     .values_list('followers_count', 'posts_count'))
+        self.assertGreater(stats[0][0], 4 * stats[len(stats) // 2][0])
+        self.assertEqual(sum(posts for _, posts in stats), SIZES['posts'])
+        self.assertTrue(FeedEntry.objects.exists())
@@ -0,0 +1,84 @@
+import os
+import tempfile
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError, connection, connections, transaction
+from django.test import SimpleTestCase
+
+from yatube.sqlite.base import DatabaseWrapper
+
+WORKERS = 8
+TRANSACTIONS = 25
+
+
+class SQLiteBackendTests(SimpleTestCase):
+    databases = {'default'}
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.settings_dict = {
+            **connection.settings_dict,
+            'NAME': os.path.join(directory.name, 'stress.sqlite3'),
+        }
+
+    def wrapper(self, alias='stress', **changes):
+        return DatabaseWrapper({**self.settings_dict, **changes}, alias)
+
+    def test_pragmas(self):
+        """PRAGMA из настроек применяются к каждому соединению."""
+        database = self.wrapper()
+        self.addCleanup(database.close)
+        with database.cursor() as cursor:
+            for pragma, expected in (('journal_mode', 'wal'),
+                                     ('synchronous', 1),
+                                     ('busy_timeout', 5000)):
+                with self.subTest(pragma=pragma):
+                    cursor.execute(f'PRAGMA {pragma}')
+                    self.assertEqual(cursor.fetchone()[0], expected)
+
+    def test_invalid_pragma(self):
+        """Значение PRAGMA не подставляется в SQL без проверки."""
+        database = self.wrapper(PRAGMAS={'cache_size': '1; DROP TABLE x'})
+        with self.assertRaises(ImproperlyConfigured):
+            database.ensure_connection()
+
+    def test_concurrent_writers(self):
+        """Параллельные транзакции «прочитать и записать» не падают."""
+        setup = self.wrapper()
+        with setup.cursor() as cursor:
+            cursor.execute('CREATE TABLE counter (value integer)')
+            cursor.execute('INSERT INTO counter VALUES (0)')
+        setup.close()
+        errors = []
+        barrier = threading.Barrier(WORKERS)
+
+        def work():
+            database = self.wrapper()
+            connections['stress'] = database
+            barrier.wait()
+            try:
+                for _ in range(TRANSACTIONS):
+                    with transaction.atomic(using='stress'):
+                        with database.cursor() as cursor:
+                            cursor.execute('SELECT value FROM counter')
+                            value = cursor.fetchone()[0]
+                            cursor.execute('UPDATE counter SET value = %s',
+                                           [value + 1])
+            except OperationalError as error:
+                errors.append(error)
+            finally:
+                database.close()
+
+        threads = [threading.Thread(target=work) for _ in range(WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        check = self.wrapper()
+        self.addCleanup(check.close)
+        with check.cursor() as cursor:
+            cursor.execute('SELECT value FROM counter')
+            self.assertEqual(cursor.fetchone()[0], WORKERS * TRANSACTIONS)
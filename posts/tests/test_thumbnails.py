@@ -0,0 +1,77 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts import thumbnails
+from posts.cache import get_cache
+from posts.constants import THUMBNAIL_SIZES
+from posts.models import Post, User
+from posts.variants import available_formats
+from . import constants as c
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='VasiaBasov')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        get_cache().clear()
+        self.guest_client = Client()
+        self.post = Post.objects.create(
+            text=c.TEXT,
+            author=self.user,
+            image=SimpleUploadedFile('small.gif', c.SMALL_GIF,
+                                     content_type='image/gif'),
+        )
+        self.POST_URL = reverse('post', args=(self.user.username,
+                                              self.post.id))
+
+    def test_placeholder_until_thumbnail_is_ready(self):
+        """Пока миниатюры нет, выводится заглушка, затем картинка."""
+        with mock.patch.object(thumbnails, 'submit') as submit:
+            response = self.guest_client.get(self.POST_URL)
+        self.assertContains(response, 'Изображение обрабатывается')
+        submit.assert_called_once_with(self.post)
+
+        thumbnails.submit(self.post)
+        geometry, options = THUMBNAIL_SIZES[0]
+        thumbnail = thumbnails.ready_thumbnail(
+            self.post.image, geometry, **options)
+        self.assertIsNotNone(thumbnail)
+        # Без адаптивных вариантов выводится миниатюра sorl.
+        self.post.image_variants.all().delete()
+        response = self.guest_client.get(self.POST_URL)
+        self.assertNotContains(response, 'Изображение обрабатывается')
+        self.assertContains(response, thumbnail.url)
+
+    def test_variants_srcset(self):
+        """После обработки картинка выводится с srcset из вариантов."""
+        thumbnails.submit(self.post)
+        variants = list(self.post.image_variants.all())
+        self.assertTrue(variants)
+        self.assertEqual({variant.format for variant in variants},
+                         {name for name, _ in available_formats()})
+        response = self.guest_client.get(c.INDEX_URL)
+        self.assertContains(response, '<picture>')
+        for variant in variants:
+            self.assertContains(response, f'{variant.width}w')
+
+    def test_backfill_variants(self):
+        """Команда backfill_variants готовит варианты для старых записей."""
+        call_command('backfill_variants', stdout=mock.MagicMock())
+        self.assertTrue(self.post.image_variants.exists())
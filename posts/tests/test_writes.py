@@ -0,0 +1,123 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import writes
+from posts.cache import get_cache
+from posts.models import Comment, FeedEntry, Follow, Post, User
+from . import constants as c
+
+
+@override_settings(WRITE_BATCHING=True)
+@mock.patch('posts.writes._ensure_worker')
+class WriteBatchingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='VasiaBasov')
+        cls.reader = User.objects.create_user(username='PetrBasov')
+        cls.post = Post.objects.create(text=c.TEXT, author=cls.author)
+        cls.POST_URL = reverse('post', args=(cls.author.username,
+                                             cls.post.pk))
+        cls.COMMENT_URL = reverse('add_comment',
+                                  args=(cls.author.username, cls.post.pk))
+        cls.FOLLOW_URL = reverse('profile_follow',
+                                 args=(cls.author.username,))
+        cls.UNFOLLOW_URL = reverse('profile_unfollow',
+                                   args=(cls.author.username,))
+
+    def setUp(self):
+        get_cache().clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+        self.addCleanup(writes.flush)
+
+    def test_comment_is_visible_to_author(self, _):
+        """Комментарий ждёт в очереди, но автор видит его сразу."""
+        self.client.post(self.COMMENT_URL, {'text': 'в очереди'})
+        self.assertFalse(Comment.objects.exists())
+        self.assertTrue(writes.has_pending(self.reader.pk))
+        self.assertFalse(writes.has_pending(self.author.pk))
+        response = self.client.get(self.POST_URL)
+        self.assertContains(response, 'в очереди')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_replies_in_one_batch(self, _):
+        """Пачка заполняет пути ответов и их счётчики."""
+        parent = Comment.objects.create(post=self.post, author=self.author,
+                                        text='родитель')
+        for number in range(3):
+            self.client.post(self.COMMENT_URL, {
+                'text': f'ответ {number}', 'parent': parent.pk})
+        self.assertEqual(writes.flush(), 3)
+        parent.refresh_from_db()
+        self.assertEqual(parent.replies_count, 3)
+        for reply in parent.replies.all():
+            with self.subTest(reply=reply.text):
+                self.assertEqual(reply.depth, 1)
+                self.assertTrue(reply.path.startswith(parent.path))
+                self.assertEqual(len(reply.path), len(parent.path) * 2)
+
+    def test_paths_are_filled_within_batch_posts(self, _):
+        """Пути ищутся только среди комментариев записей из пачки."""
+        self.client.post(self.COMMENT_URL, {'text': 'корень'})
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(writes.flush(), 1)
+        unfilled = [query['sql'] for query in queries.captured_queries
+                    if '"path" = \'\'' in query['sql']]
+        self.assertTrue(unfilled)
+        for sql in unfilled:
+            with self.subTest(sql=sql):
+                self.assertIn('"post_id" IN', sql)
+        self.assertTrue(Comment.objects.get().path)
+
+    def test_follow_batch(self, _):
+        """Повторные подписки в пачке дают одну строку и ленту."""
+        self.client.get(self.FOLLOW_URL)
+        self.client.get(self.FOLLOW_URL)
+        self.assertFalse(Follow.objects.exists())
+        response = self.client.get(reverse('follow_index'))
+        self.assertContains(response, c.TEXT)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertTrue(FeedEntry.objects.filter(user=self.reader).exists())
+        self.author.stats.refresh_from_db()
+        self.assertEqual(self.author.stats.followers_count, 1)
+
+    def test_unfollow_pending(self, _):
+        """Отписка после подписки из очереди удаляет подписку."""
+        self.client.get(self.FOLLOW_URL)
+        self.client.get(self.UNFOLLOW_URL)
+        writes.flush()
+        self.assertFalse(Follow.objects.exists())
+
+    def test_deleted_post_drops_only_its_comments(self, _):
+        """Комментарий к удалённой записи не срывает остальную пачку."""
+        doomed = Post.objects.create(text=c.TEXT, author=self.author)
+        self.client.post(self.COMMENT_URL, {'text': 'останется'})
+        self.client.post(
+            reverse('add_comment', args=(self.author.username, doomed.pk)),
+            {'text': 'пропадёт'})
+        self.client.get(self.FOLLOW_URL)
+        doomed.delete()
+        self.assertEqual(writes.flush(), 2)
+        self.assertEqual(list(Comment.objects.values_list('text', flat=True)),
+                         ['останется'])
+        self.assertTrue(Follow.objects.exists())
+        self.assertFalse(writes.has_pending(self.reader.pk))
+
+    def test_failed_batch_is_requeued(self, _):
+        """Пачка с ошибкой возвращается в очередь, страница открывается."""
+        self.client.post(self.COMMENT_URL, {'text': 'в очереди'})
+        with mock.patch('posts.writes._write_comments',
+                        side_effect=RuntimeError):
+            response = self.client.get(self.POST_URL)
+            self.assertEqual(response.status_code, 200)
+            with self.assertRaises(RuntimeError):
+                writes.flush()
+        self.assertTrue(writes.has_pending(self.reader.pk))
+        self.assertEqual(writes.flush(), 1)
+        self.assertTrue(Comment.objects.filter(text='в очереди').exists())
@@ -0,0 +1,113 @@
+"""Фоновая подготовка миниатюр картинок к записям.
+
+sorl-thumbnail создаёт миниатюру при первом рендере шаблона, и страница
+ждёт, пока Pillow откроет и пережмёт оригинал. Здесь стандартные размеры
+готовятся в пуле потоков сразу после сохранения записи, а шаблон, пока
+миниатюры нет в хранилище sorl, показывает заглушку. Тот же воркер
+готовит адаптивные варианты картинки (см. posts.variants).
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import connections, transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from yatube.metrics import THUMBNAIL_SECONDS
+
+from . import cache, variants
+from . import constants as c
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_pending = set()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def _full_options(source, options):
+    # Повторяет подготовку опций в ThumbnailBackend.get_thumbnail, чтобы
+    # имя миниатюры совпало с тем, что создаст sorl.
+    backend = default.backend
+    options = dict(options)
+    if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(thumbnail_settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+    return options
+
+
+def ready_thumbnail(file_, geometry, **options):
+    """Готовая миниатюра или None, если её ещё нет в хранилище sorl."""
+    if not file_:
+        return None
+    source = ImageFile(file_)
+    name = default.backend._get_thumbnail_filename(
+        source, geometry, _full_options(source, options))
+    return default.kvstore.get(ImageFile(name, default.storage))
+
+
+def generate(file_):
+    for geometry, options in c.THUMBNAIL_SIZES:
+        get_thumbnail(file_, geometry, **options)
+
+
+def _run(post, scopes):
+    name = post.image.name
+    try:
+        with THUMBNAIL_SECONDS.time():
+            generate(post.image)
+            variants.generate(post)
+    except Exception:
+        logger.exception('Не удалось подготовить миниатюры для %s', name)
+    else:
+        # Закешированные фрагменты страниц ещё показывают заглушку.
+        cache.bump(*scopes)
+    finally:
+        _pending.discard(name)
+
+
+def _run_in_worker(post, scopes):
+    try:
+        _run(post, scopes)
+    finally:
+        connections.close_all()
+
+
+def submit(post):
+    name = post.image.name if post.image else None
+    if not name or name in _pending:
+        return
+    try:
+        if not default.storage.exists(name):
+            return
+    except SuspiciousFileOperation:
+        return
+    _pending.add(name)
+    scopes = cache.post_scopes(post)
+    if settings.THUMBNAIL_WORKERS:
+        _get_executor().submit(_run_in_worker, post, scopes)
+    else:
+        _run(post, scopes)
+
+
+def schedule(post):
+    if post.image:
+        transaction.on_commit(lambda: submit(post))
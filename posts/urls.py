@@ -8,10 +8,15 @@ urlpatterns = [
     path('new/', views.new_post, name='new_post'),
     path('', views.index, name='index'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('hot/', views.hot_posts, name='hot'),
+    path('search/', views.search_posts, name='search'),
+    path('export/', views.export_data, name='export'),
     path('404/', views.page_not_found, name='404'),
     path('500/', views.server_error, name='500'),
     path('<str:username>/', views.profile, name='profile'),
     path('<str:username>/<int:post_id>/', views.post_view, name='post'),
+    path('<str:username>/<int:post_id>/comments/', views.post_comments,
+         name='post_comments'),
     path('<str:username>/<int:post_id>/edit/', views.post_edit,
          name='post_edit'),
     path('<str:username>/<int:post_id>/comment/',
@@ -0,0 +1,130 @@
+"""Адаптивные варианты картинок к записям.
+
+Из ``Post.image`` готовится несколько ширин в современных форматах (AVIF,
+если Pillow собран с его поддержкой, и WebP) и в JPEG для старых браузеров.
+Размеры и имена файлов хранятся в ImageVariant, поэтому шаблон собирает
+``srcset`` по строкам из базы и не обращается к хранилищу при рендере.
+"""
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps, features
+
+from .models import ImageVariant
+from . import constants as c
+
+FORMATS = (
+    ('avif', 'AVIF', 'image/avif'),
+    ('webp', 'WEBP', 'image/webp'),
+    ('jpeg', 'JPEG', 'image/jpeg'),
+)
+FALLBACK_FORMAT = 'jpeg'
+MIME_TYPES = {name: mime for name, _, mime in FORMATS}
+
+
+def _supported(name):
+    if name == FALLBACK_FORMAT:
+        return True
+    try:
+        return features.check_module(name)
+    except ValueError:
+        # Старые Pillow не знают модуля avif вовсе.
+        return False
+
+
+def available_formats():
+    return [(name, codec) for name, codec, _ in FORMATS if _supported(name)]
+
+
+def widths_for(image):
+    widths = [width for width in c.IMAGE_VARIANT_WIDTHS
+              if width <= image.width]
+    return widths or [min(c.IMAGE_VARIANT_WIDTHS)]
+
+
+def _encode(image, codec):
+    if codec == 'JPEG' or 'A' not in image.getbands():
+        image = image.convert('RGB')
+    else:
+        image = image.convert('RGBA')
+    buffer = BytesIO()
+    image.save(buffer, codec, quality=c.IMAGE_VARIANT_QUALITY)
+    return buffer.getvalue()
+
+
+def _variant_name(post, width, name):
+    stem = os.path.splitext(os.path.basename(post.image.name))[0]
+    return f'posts/variants/{post.pk}/{stem}-{width}.{name}'
+
+
+def remove_files(storage, names):
+    for name in names:
+        storage.delete(name)
+
+
+def generate(post):
+    """Пересоздаёт варианты картинки записи и возвращает их."""
+    storage = post.image.storage
+    source = post.image.name
+    with storage.open(source, 'rb') as file_:
+        original = ImageOps.exif_transpose(Image.open(file_))
+        original.load()
+    ratio_width, ratio_height = c.IMAGE_VARIANT_RATIO
+    created = []
+    for width in widths_for(original):
+        height = round(width * ratio_height / ratio_width)
+        frame = ImageOps.fit(original, (width, height), Image.LANCZOS)
+        for name, codec in available_formats():
+            file_name = storage.save(
+                _variant_name(post, width, name),
+                ContentFile(_encode(frame, codec)),
+            )
+            created.append(ImageVariant(
+                post_id=post.pk, source=source, file=file_name,
+                format=name, width=width, height=height,
+            ))
+    with transaction.atomic():
+        variants = ImageVariant.objects.filter(post_id=post.pk)
+        kept = {variant.file for variant in created}
+        stale = [name for name in variants.values_list('file', flat=True)
+                 if name not in kept]
+        variants.delete()
+        ImageVariant.objects.bulk_create(created)
+    transaction.on_commit(lambda: remove_files(storage, stale))
+    return created
+
+
+def picture(post):
+    """Данные для ``<picture>`` или None, если вариантов ещё нет."""
+    if not post.image:
+        return None
+    variants = [variant for variant in post.image_variants.all()
+                if variant.source == post.image.name]
+    if not variants:
+        return None
+    storage = post.image.storage
+    by_format = {}
+    for variant in sorted(variants, key=lambda variant: variant.width):
+        by_format.setdefault(variant.format, []).append(variant)
+    fallback = by_format.pop(FALLBACK_FORMAT, None)
+    if fallback is None:
+        fallback = by_format.pop(next(reversed(list(by_format))))
+
+    def srcset(items):
+        return ', '.join(f'{storage.url(item.file)} {item.width}w'
+                         for item in items)
+
+    largest = fallback[-1]
+    return {
+        'sizes': c.IMAGE_VARIANT_SIZES,
+        'sources': [
+            {'type': MIME_TYPES[name], 'srcset': srcset(by_format[name])}
+            for name, _, _ in FORMATS if name in by_format
+        ],
+        'src': storage.url(largest.file),
+        'srcset': srcset(fallback),
+        'width': largest.width,
+        'height': largest.height,
+    }
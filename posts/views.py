@@ -1,43 +1,116 @@
-from django.core.paginator import Paginator
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.http import Http404, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
 
 from .models import Post, Group, User, Comment, Follow
-from .forms import PostForm, CommentForm
+from .forms import PostForm, CommentForm, SearchForm
+from .cache import (HOT_SCOPE, POSTS_SCOPE, author_scope, follow_scope,
+                    group_scope, page_cache, post_scope)
+from .conditional import author_pk, group_pk, newest, page_validators
+from .feed import FeedPaginator
+from .pagination import CursorPaginator, paginate
+from .replicas import replica_reads
+from .search import search
+from . import concurrent, export, hot, writes
+from .writes import read_your_writes
 from . import constants as c
 
 
+def comment_page(request, username, post_id):
+    """Страница ветки комментариев по курсору ?comments=.
+
+    Порядок по материализованному пути: ответы идут сразу за родителем,
+    вся ветка читается одним запросом без рекурсии.
+    """
+    comments = Comment.objects.filter(post_id=post_id).select_related('author')
+    paginator = CursorPaginator(comments, c.COMMENTS_PER_PAGE,
+                                ordering=('path',))
+    page = paginator.get_page(request.GET.get('comments'))
+    return {
+        'comments': page.object_list,
+        'comments_page': page,
+        'post_url': reverse('post', args=(username, post_id)),
+        'comments_url': reverse('post_comments', args=(username, post_id)),
+    }
+
+
+@read_your_writes
+@replica_reads
+@page_validators(
+    lambda request: [POSTS_SCOPE],
+    lambda request: newest(Post.objects.all(), Comment.objects.all()),
+)
 def index(request):
-    latest = Post.objects.all()
-    paginator = Paginator(latest, c.PGR)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    latest = Post.objects.for_listing()
     context = {
-        'page': page,
-        'paginator': paginator,
+        **paginate(request, latest),
+        **page_cache(request, POSTS_SCOPE),
     }
     return render(request, 'index.html', context)
 
 
+@read_your_writes
+@replica_reads
+@page_validators(
+    lambda request, slug: [group_scope(group_pk(slug))],
+    lambda request, slug: newest(
+        Post.objects.filter(group__slug=slug),
+        Comment.objects.filter(post__group__slug=slug)),
+)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = Post.objects.filter(group=group).all()
-    paginator = Paginator(posts, c.PGR)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    posts = Post.objects.for_listing().filter(group=group)
     context = {
         'group': group,
         'posts': posts,
-        'page': page,
-        'paginator': paginator,
+        **paginate(request, posts),
+        **page_cache(request, group_scope(group.pk)),
     }
     return render(request, 'group.html', context)
 
 
+@read_your_writes
+@replica_reads
+@page_validators(lambda request: [POSTS_SCOPE, HOT_SCOPE])
+def hot_posts(request):
+    context = {
+        **paginate(request, None, paginator=hot.HotPaginator()),
+        **page_cache(request, POSTS_SCOPE, HOT_SCOPE),
+    }
+    return render(request, 'hot.html', context)
+
+
+def search_posts(request):
+    form = SearchForm(request.GET or None)
+    results = Post.objects.none()
+    if form.is_valid() and form.cleaned_data['q']:
+        author = None
+        if form.cleaned_data['author']:
+            author = User.objects.filter(
+                username=form.cleaned_data['author']).first()
+        if author is not None or not form.cleaned_data['author']:
+            results = search(form.cleaned_data['q'],
+                             group=form.cleaned_data['group'],
+                             author=author)
+    query = request.GET.copy()
+    query.pop('page', None)
+    paginator = Paginator(results.prefetch_related('image_variants'), c.PGR)
+    context = {
+        'form': form,
+        'paginator': paginator,
+        'page': paginator.get_page(request.GET.get('page')),
+        'page_query': query.urlencode(),
+    }
+    return render(request, 'search.html', context)
+
+
 @login_required
 def new_post(request):
     if request.method == 'POST':
-        form = PostForm(request.POST)
+        form = PostForm(request.POST, files=request.FILES or None)
         if form.is_valid():
             post = form.save(commit=False)
             post.author = request.user
@@ -47,45 +120,98 @@ def new_post(request):
     return render(request, 'new.html', {'form': form, 'is_edit': True})
 
 
+@read_your_writes
+@replica_reads
+@page_validators(
+    lambda request, username: [author_scope(author_pk(username))],
+    lambda request, username: newest(
+        Post.objects.filter(author__username=username),
+        Comment.objects.filter(post__author__username=username)),
+)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    paginator = Paginator(post_list, c.PGR)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    author = get_object_or_404(User.objects.select_related('stats'),
+                               username=username)
+    post_list = author.posts.for_listing()
     following = (request.user.is_authenticated and request.user != author)
+    stats = getattr(author, 'stats', None)
+    paginator = CursorPaginator(
+        post_list, c.PGR, known_count=stats.posts_count if stats else None)
     context = {
-        'page': page,
         'author': author,
-        'paginator': paginator,
         'following': following,
+        **paginate(request, post_list, paginator=paginator),
+        **page_cache(request, author_scope(author.pk)),
     }
     return render(request, 'profile.html', context)
 
 
+@read_your_writes
+@replica_reads
+@page_validators(
+    lambda request, username, post_id: [
+        post_scope(post_id), author_scope(author_pk(username))],
+    lambda request, username, post_id: newest(
+        Post.objects.filter(pk=post_id),
+        Comment.objects.filter(post_id=post_id)),
+)
 def post_view(request, username, post_id):
-    author = get_object_or_404(User, username=username)
+    def comments():
+        context = comment_page(request, username, post_id)
+        if concurrent.enabled():
+            # Страница комментариев и проверка следующей читаются в потоке
+            # пула, а не при рендере шаблона.
+            context['comments_page'].has_next()
+        return context
+
+    author, post, comments_context = concurrent.gather(
+        lambda: User.objects.select_related('stats').filter(
+            username=username).first(),
+        lambda: Post.objects.filter(id=post_id,
+                                    author__username=username).first(),
+        comments,
+    )
+    if author is None or post is None:
+        raise Http404
+    post.author = author
     text = Post._meta.get_field('text')
-    post = get_object_or_404(Post, id=post_id, author=author)
-    count = Post.objects.filter(author=author).select_related('author').count()
-    comments = Comment.objects.filter(post_id=post_id)
     form = CommentForm(request.POST or None)
     context = {
         'post': post,
         'author': author,
-        'count': count,
         'post_id': post_id,
         'text': text,
-        'comments': comments,
         'form': form,
+        'reply_to': request.GET.get('reply', ''),
+        **comments_context,
+        **page_cache(request, post_scope(post.pk), author_scope(author.pk)),
     }
     return render(request, 'post.html', context)
 
 
+@read_your_writes
+@replica_reads
+@page_validators(
+    lambda request, username, post_id: [post_scope(post_id)],
+    lambda request, username, post_id: newest(
+        Post.objects.filter(pk=post_id),
+        Comment.objects.filter(post_id=post_id)),
+)
+def post_comments(request, username, post_id):
+    if not Post.objects.filter(id=post_id,
+                               author__username=username).exists():
+        raise Http404
+    context = {
+        **comment_page(request, username, post_id),
+        **page_cache(request, post_scope(post_id)),
+    }
+    return render(request, 'comments_page.html', context)
+
+
 @login_required
 def post_edit(request, username, post_id):
     post = get_object_or_404(Post, id=post_id, author__username=username)
-    form = PostForm(request.POST or None, instance=post)
+    form = PostForm(request.POST or None, files=request.FILES or None,
+                    instance=post)
     context = {
         'form': form,
         'is_edit': True,
@@ -103,27 +229,66 @@ def post_edit(request, username, post_id):
 def add_comment(request, username, post_id):
     post = get_object_or_404(Post, id=post_id, author__username=username)
     form = CommentForm(request.POST or None)
+    parent = None
+    parent_id = request.POST.get('parent', '')
+    if form.is_valid() and parent_id:
+        if parent_id.isdigit():
+            parent = Comment.objects.filter(pk=parent_id, post=post).first()
+        if parent is None:
+            form.add_error(None, 'Комментарий, на который вы отвечаете, '
+                                 'не найден')
     context = {
         'post': post,
         'form': form,
+        'reply_to': parent_id,
+        **comment_page(request, username, post_id),
+        **page_cache(request, post_scope(post.pk),
+                     author_scope(post.author_id)),
     }
     if not form.is_valid():
         return render(request, 'post.html', context)
     comment = form.save(commit=False)
     comment.author = request.user
     comment.post = post
-    form.save()
+    comment.set_parent(parent)
+    if writes.enabled():
+        writes.submit(comment)
+    else:
+        comment.save()
     return redirect('post', username=username, post_id=post_id)
 
 
 @login_required
+@read_your_writes
+@replica_reads
+@page_validators(
+    lambda request: [POSTS_SCOPE, follow_scope(request.user.pk)])
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, c.PGR)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, 'follow.html', {'page': page,
-                                           'paginator': paginator})
+    context = {
+        **paginate(request, None, paginator=FeedPaginator(request.user)),
+        **page_cache(request, POSTS_SCOPE, follow_scope(request.user.pk)),
+    }
+    return render(request, 'follow.html', context)
+
+
+@login_required
+def export_data(request):
+    """Архив данных пользователя: ?format=zip (по умолчанию) или ndjson."""
+    user = request.user
+    fmt = request.GET.get('format', 'zip')
+    if fmt == 'zip':
+        storage = Post._meta.get_field('image').storage
+        response = StreamingHttpResponse(export.archive(user, storage),
+                                         content_type='application/zip')
+    elif fmt == 'ndjson':
+        response = StreamingHttpResponse(
+            export.ndjson(user), content_type='application/x-ndjson')
+    else:
+        raise Http404
+    response['Content-Disposition'] = (
+        f'attachment; filename="yatube-{user.username}.{fmt}"')
+    patch_cache_control(response, private=True, no_store=True)
+    return response
 
 
 @login_required
@@ -131,16 +296,20 @@ def profile_follow(request, username):
     user = request.user
     author = get_object_or_404(User, username=username)
     if user != author:
-        Follow.objects.get_or_create(
-            user=user,
-            author=author,
-        )
+        if writes.enabled():
+            writes.submit(Follow(user=user, author=author))
+        else:
+            Follow.objects.get_or_create(
+                user=user,
+                author=author,
+            )
     return redirect('profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
+    writes.flush_for(request.user)
     Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('profile', username=username)
 
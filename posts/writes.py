@@ -0,0 +1,251 @@
+"""Пакетная запись комментариев и подписок (YATUBE_WRITE_BATCHING=1).
+
+Во время всплесков каждый комментарий и подписка — отдельная транзакция,
+а SQLite пишет их строго по одной. Здесь вставки копятся в очереди
+процесса, и фоновый поток раз в WRITE_BATCH_INTERVAL секунд (или сразу по
+набору WRITE_BATCH_SIZE штук) записывает их одной транзакцией через
+bulk_create. bulk_create не шлёт post_save, поэтому то, что делают
+сигналы (счётчики, ленты, версии кеша, метрики), применяется здесь для
+всей пачки сразу.
+
+Свои записи пользователь видит сразу: представления чтения обёрнуты в
+read_your_writes, который сбрасывает очередь синхронно, если в ней есть
+записи этого пользователя. Очередь своя у каждого процесса, так что при
+нескольких воркерах запись из чужого процесса появится не позже чем через
+WRITE_BATCH_INTERVAL. При остановке процесса очередь сбрасывается в atexit.
+
+Элементы, чья запись, родительский комментарий или пользователь удалены,
+пока они ждали в очереди, перед вставкой отбрасываются. При любой другой
+ошибке пачка возвращается в очередь (не больше WRITE_RETRY_LIMIT раз).
+"""
+import atexit
+import logging
+import os
+import threading
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from yatube.metrics import WRITES
+
+from .models import Comment, Follow, Post, User
+from . import cache, counters, feed, hot, replicas
+from . import constants as c
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_wakeup = threading.Event()
+_pending = []
+_in_flight = []
+_worker = None
+_worker_pid = None
+
+
+def enabled():
+    return settings.WRITE_BATCHING
+
+
+def _owner(obj):
+    return obj.author_id if isinstance(obj, Comment) else obj.user_id
+
+
+def _ensure_worker():
+    global _worker, _worker_pid
+    # После fork поток мастера в воркере не работает.
+    if _worker is not None and _worker_pid == os.getpid():
+        return
+    _worker_pid = os.getpid()
+    _worker = threading.Thread(target=_run, name='write-batches',
+                               daemon=True)
+    _worker.start()
+
+
+def _run():
+    while True:
+        _wakeup.wait(c.WRITE_BATCH_INTERVAL)
+        _wakeup.clear()
+        try:
+            flush()
+        except Exception:
+            logger.exception('Не удалось записать пачку комментариев '
+                             'и подписок')
+        finally:
+            close_old_connections()
+
+
+def submit(obj):
+    """Поставить несохранённый Comment или Follow в очередь."""
+    replicas.mark_write()
+    with _lock:
+        _pending.append(obj)
+        full = len(_pending) >= c.WRITE_BATCH_SIZE
+        _ensure_worker()
+    if full:
+        _wakeup.set()
+
+
+def has_pending(user_id):
+    with _lock:
+        return any(_owner(obj) == user_id
+                   for obj in (*_pending, *_in_flight))
+
+
+def _existing(model, ids):
+    return set(model.objects.filter(pk__in=ids).values_list('pk', flat=True))
+
+
+def _valid(batch):
+    """Элементы пачки, чьи запись, родитель и пользователи ещё есть.
+
+    Пока элемент ждал в очереди, запись или комментарий могли удалить;
+    такой элемент отбрасывается, чтобы не сорвать всю пачку.
+    """
+    comments = [obj for obj in batch if isinstance(obj, Comment)]
+    follows = [obj for obj in batch if isinstance(obj, Follow)]
+    posts = _existing(Post, {obj.post_id for obj in comments})
+    parents = _existing(Comment, {obj.parent_id for obj in comments
+                                  if obj.parent_id is not None})
+    users = _existing(User, {
+        *(obj.author_id for obj in comments),
+        *(obj.user_id for obj in follows),
+        *(obj.author_id for obj in follows),
+    })
+    valid = []
+    for obj in batch:
+        if isinstance(obj, Comment):
+            ok = (obj.post_id in posts and obj.author_id in users
+                  and (obj.parent_id is None or obj.parent_id in parents))
+        else:
+            ok = obj.user_id in users and obj.author_id in users
+        if ok:
+            valid.append(obj)
+    if len(valid) < len(batch):
+        logger.warning('Отброшено элементов пачки с удалёнными связями: %d',
+                       len(batch) - len(valid))
+    return valid
+
+
+def _requeue(batch):
+    """Вернуть пачку в начало очереди; после WRITE_RETRY_LIMIT попыток
+    элементы отбрасываются."""
+    retry = []
+    for obj in batch:
+        obj.write_attempts = getattr(obj, 'write_attempts', 0) + 1
+        if obj.write_attempts < c.WRITE_RETRY_LIMIT:
+            retry.append(obj)
+    if len(retry) < len(batch):
+        logger.error('Отброшено элементов пачки после повторных ошибок: %d',
+                     len(batch) - len(retry))
+    with _lock:
+        _pending[:0] = retry
+
+
+def flush():
+    """Записать всё из очереди; возвращает число записанных элементов.
+
+    При ошибке пачка возвращается в очередь, а исключение пробрасывается.
+    """
+    with _flush_lock:
+        with _lock:
+            batch = _pending[:]
+            del _pending[:]
+            _in_flight[:] = batch
+        try:
+            if not batch:
+                return 0
+            try:
+                batch = _valid(batch)
+                with transaction.atomic():
+                    comments = [obj for obj in batch
+                                if isinstance(obj, Comment)]
+                    follows = [obj for obj in batch
+                               if isinstance(obj, Follow)]
+                    if comments:
+                        _write_comments(comments)
+                    if follows:
+                        _write_follows(follows)
+            except Exception:
+                _requeue(batch)
+                raise
+            return len(batch)
+        finally:
+            with _lock:
+                del _in_flight[:]
+
+
+def flush_for(user):
+    if enabled() and user.is_authenticated and has_pending(user.pk):
+        try:
+            flush()
+        except Exception:
+            # Страница откроется и без своих записей: они остались в
+            # очереди, и фоновый поток повторит попытку.
+            logger.exception('Не удалось записать пачку комментариев '
+                             'и подписок')
+
+
+def read_your_writes(view):
+    """Перед чтением сбросить очередь, если в ней записи пользователя."""
+    @wraps(view)
+    def inner(request, *args, **kwargs):
+        flush_for(request.user)
+        return view(request, *args, **kwargs)
+    return inner
+
+
+def _write_comments(comments):
+    Comment.objects.bulk_create(comments, batch_size=c.BULK_BATCH_SIZE)
+    Comment.objects.fill_paths({comment.post_id for comment in comments})
+    added = Counter(comment.post_id for comment in comments)
+    for post_id, count in added.items():
+        counters.adjust_post(post_id, count)
+    hot.add_comments(added)
+    for parent_id, count in Counter(
+            comment.parent_id for comment in comments
+            if comment.parent_id is not None).items():
+        counters.adjust_replies(parent_id, count)
+    posts = Post.objects.filter(
+        pk__in={comment.post_id for comment in comments},
+    ).only('author_id', 'group_id')
+    cache.bump(*(scope for post in posts for scope in cache.post_scopes(post)))
+    WRITES.inc(len(comments), model='comment')
+
+
+def _write_follows(follows):
+    pairs = {(follow.user_id, follow.author_id) for follow in follows
+             if follow.user_id != follow.author_id}
+    existing = set(
+        Follow.objects.filter(
+            user_id__in={user_id for user_id, _ in pairs},
+            author_id__in={author_id for _, author_id in pairs},
+        ).values_list('user_id', 'author_id')
+    )
+    pairs -= existing
+    if not pairs:
+        return
+    Follow.objects.bulk_create(
+        [Follow(user_id=user_id, author_id=author_id)
+         for user_id, author_id in sorted(pairs)],
+        batch_size=c.BULK_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    for author_id, added in Counter(
+            author_id for _, author_id in pairs).items():
+        counters.adjust_user(author_id, followers_count=added)
+    for user_id, added in Counter(user_id for user_id, _ in pairs).items():
+        counters.adjust_user(user_id, following_count=added)
+    feed.mark_heavy({author_id for _, author_id in pairs})
+    scopes = set()
+    for user_id, author_id in pairs:
+        feed.add_author_to_feed(user_id, author_id)
+        scopes.update((cache.author_scope(author_id),
+                       cache.author_scope(user_id),
+                       cache.follow_scope(user_id)))
+    cache.bump(*scopes)
+
+
+atexit.register(flush)
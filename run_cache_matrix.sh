@@ -0,0 +1,22 @@
+#!/bin/sh
+# Прогоняет тесты на каждом бэкенде кеша из YATUBE_CACHE.
+# Бэкенд db проверяется в posts/tests/test_cache_backends.py: ему нужна
+# таблица createcachetable, которой нет в тестовой базе.
+set -e
+
+BACKENDS="locmem file"
+if [ -n "$YATUBE_TEST_REDIS" ]; then
+    BACKENDS="$BACKENDS redis"
+fi
+
+for backend in $BACKENDS; do
+    echo "== YATUBE_CACHE=$backend"
+    location=""
+    if [ "$backend" = "file" ]; then
+        location=$(mktemp -d)
+    elif [ "$backend" = "redis" ]; then
+        location="$YATUBE_TEST_REDIS"
+    fi
+    YATUBE_CACHE=$backend YATUBE_CACHE_LOCATION=$location \
+        python -m pytest -q tests posts/tests
+done
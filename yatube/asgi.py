@@ -1,8 +1,23 @@
+"""Точка входа ASGI.
+
+django.core.asgi появился только в Django 3.0. На Django 2.2 проект
+разворачивается через yatube.wsgi в многопоточных воркерах (например,
+``gunicorn yatube.wsgi --workers 4 --threads 8``), а независимые запросы
+страниц читаются параллельно при YATUBE_CONCURRENT_READS=1. Сравнить
+режимы под нагрузкой можно командой ``load_test``.
+"""
 import os
 
-from django.core.asgi import get_asgi_application
+from django.core.exceptions import ImproperlyConfigured
 
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
+try:
+    from django.core.asgi import get_asgi_application
+except ImportError as error:
+    raise ImproperlyConfigured(
+        'Для ASGI нужен Django 3.0 или новее, используйте yatube.wsgi'
+    ) from error
+
 application = get_asgi_application()
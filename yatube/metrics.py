@@ -0,0 +1,353 @@
+"""Метрики приложения в текстовом формате Prometheus (/metrics).
+
+Сбор включается настройкой METRICS, а /metrics отдаётся только адресам из
+METRICS_ALLOWED_IPS или по заголовку «Authorization: Bearer
+<METRICS_TOKEN>».
+
+Реестр живёт в памяти процесса. Под gunicorn с несколькими воркерами
+задайте общий каталог YATUBE_METRICS_DIR: фоновый поток каждого процесса
+раз в METRICS_FLUSH_INTERVAL секунд сбрасывает туда свой снимок (файл
+<pid>-<boot>.json, запись через os.replace), а /metrics складывает снимки
+живых процессов. boot меняется при каждом запуске и fork, поэтому новый
+процесс с тем же pid не затирает чужой файл; файлы завершившихся
+процессов удаляются, и их счётчики Prometheus видит как сброс.
+"""
+import copy
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed, PermissionDenied
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+
+from .querywrappers import wrap_queries
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.boot = uuid.uuid4().hex[:12]
+        self.flusher = None
+        self.dirty = False
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def _check_fork(self):
+        # Воркер после fork не должен повторно отдать значения мастера,
+        # а его поток сброса в воркер не переходит.
+        if os.getpid() != self.pid:
+            self.pid = os.getpid()
+            self.boot = uuid.uuid4().hex[:12]
+            self.flusher = None
+            for metric in self.metrics.values():
+                metric.values.clear()
+
+    def update(self, metric, labels, change):
+        if not settings.METRICS:
+            return
+        with self.lock:
+            self._check_fork()
+            change(metric.values, labels)
+            self.dirty = True
+            if self.flusher is None and self.directory():
+                self.flusher = threading.Thread(
+                    target=self._flush_loop, name='metrics-flush',
+                    daemon=True)
+                self.flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(getattr(settings, 'METRICS_FLUSH_INTERVAL', 1))
+            if self.dirty:
+                try:
+                    self.flush()
+                except OSError:
+                    self.dirty = True
+
+    def snapshot(self):
+        with self.lock:
+            self._check_fork()
+            return {
+                metric.name: {
+                    'type': metric.type,
+                    'help': metric.help,
+                    'labels': metric.labelnames,
+                    'buckets': getattr(metric, 'buckets', None),
+                    'values': [[list(labels), copy.deepcopy(value)]
+                               for labels, value in metric.values.items()],
+                }
+                for metric in self.metrics.values()
+            }
+
+    def directory(self):
+        return getattr(settings, 'METRICS_DIR', None)
+
+    def filename(self):
+        return f'{self.pid}-{self.boot}.json'
+
+    def flush(self):
+        directory = self.directory()
+        if not directory:
+            return
+        os.makedirs(directory, exist_ok=True)
+        self.dirty = False
+        snapshot = self.snapshot()
+        path = os.path.join(directory, self.filename())
+        temporary = f'{path}.{threading.get_ident()}.tmp'
+        with open(temporary, 'w') as file_:
+            json.dump(snapshot, file_)
+        os.replace(temporary, path)
+
+    def _stale(self, name):
+        """Файл процесса, который уже завершился."""
+        pid, _, boot = name[:-len('.json')].partition('-')
+        if not pid.isdigit():
+            return False
+        if int(pid) == self.pid:
+            return boot != self.boot
+        return not _alive(int(pid))
+
+    def collect(self):
+        """Снимок живых процессов (или только текущего без каталога)."""
+        directory = self.directory()
+        if not directory:
+            return self.snapshot()
+        self.flush()
+        snapshots = []
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                if self._stale(name):
+                    os.remove(path)
+                    continue
+                with open(path) as file_:
+                    snapshots.append(json.load(file_))
+            except (OSError, ValueError):
+                continue
+        return merge(snapshots)
+
+
+def merge(snapshots):
+    merged = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, {**metric, 'values': []})
+            values = {tuple(labels): value
+                      for labels, value in target['values']}
+            for labels, value in metric['values']:
+                labels = tuple(labels)
+                if labels not in values:
+                    values[labels] = value
+                elif metric['type'] == 'counter':
+                    values[labels] += value
+                else:
+                    current = values[labels]
+                    values[labels] = {
+                        'buckets': [a + b for a, b in zip(current['buckets'],
+                                                          value['buckets'])],
+                        'sum': current['sum'] + value['sum'],
+                        'count': current['count'] + value['count'],
+                    }
+            target['values'] = [[list(labels), value]
+                                for labels, value in values.items()]
+    return merged
+
+
+def _escape(value):
+    return (str(value).replace('\\', '\\\\').replace('\n', '\\n')
+            .replace('"', '\\"'))
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"'
+                          for name, value in pairs) + '}'
+
+
+def render(snapshot):
+    lines = []
+    for name in sorted(snapshot):
+        metric = snapshot[name]
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for labels, value in sorted(metric['values'],
+                                    key=lambda item: item[0]):
+            if metric['type'] == 'counter':
+                lines.append(
+                    f"{name}{_labels(metric['labels'], labels)} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip([*metric['buckets'], '+Inf'],
+                                    value['buckets']):
+                cumulative += count
+                lines.append(
+                    f"{name}_bucket"
+                    f"{_labels(metric['labels'], labels, [('le', bound)])} "
+                    f"{cumulative}")
+            lines.append(f"{name}_sum{_labels(metric['labels'], labels)} "
+                         f"{value['sum']}")
+            lines.append(f"{name}_count{_labels(metric['labels'], labels)} "
+                         f"{value['count']}")
+    return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, help, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = list(labelnames)
+        self.values = {}
+        self.registry = registry
+        registry.register(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+
+        def change(values, key):
+            values[key] = values.get(key, 0) + amount
+        self.registry.update(self, key, change)
+
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS,
+                 registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = list(labelnames)
+        self.buckets = list(buckets)
+        self.values = {}
+        self.registry = registry
+        registry.register(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+
+        def change(values, key):
+            current = values.setdefault(key, {
+                'buckets': [0] * (len(self.buckets) + 1), 'sum': 0, 'count': 0,
+            })
+            current['buckets'][index] += 1
+            current['sum'] += value
+            current['count'] += 1
+        self.registry.update(self, key, change)
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started,
+                               **self.labels)
+
+
+REQUEST_LATENCY = Histogram(
+    'yatube_request_duration_seconds',
+    'Время обработки запроса по имени URL',
+    ['view'],
+)
+REQUEST_QUERIES = Histogram(
+    'yatube_request_queries',
+    'Число SQL-запросов на HTTP-запрос по имени URL',
+    ['view'],
+    buckets=QUERY_BUCKETS,
+)
+TEMPLATE_CACHE = Counter(
+    'yatube_template_cache_total',
+    'Обращения к кешу фрагментов шаблонов',
+    ['fragment', 'result'],
+)
+THUMBNAIL_SECONDS = Histogram(
+    'yatube_thumbnail_seconds',
+    'Время подготовки миниатюр и вариантов картинки записи',
+)
+WRITES = Counter(
+    'yatube_writes_total',
+    'Созданные записи и комментарии',
+    ['model'],
+)
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        if not settings.METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = itertools.count()
+
+        def count(execute, sql, params, many, context):
+            next(queries)
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        with wrap_queries(count):
+            response = self.get_response(request)
+        match = getattr(request, 'resolver_match', None)
+        view = (match.url_name or match.view_name) if match else 'unmatched'
+        REQUEST_LATENCY.observe(time.perf_counter() - started, view=view)
+        REQUEST_QUERIES.observe(next(queries), view=view)
+        return response
+
+
+def _allowed(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if token and constant_time_compare(header, f'Bearer {token}'):
+        return True
+    return request.META.get('REMOTE_ADDR') in getattr(
+        settings, 'METRICS_ALLOWED_IPS', ())
+
+
+def metrics_view(request):
+    if not settings.METRICS:
+        raise Http404
+    if not _allowed(request):
+        raise PermissionDenied
+    return HttpResponse(render(REGISTRY.collect()),
+                        content_type=CONTENT_TYPE)
@@ -0,0 +1,122 @@
+"""Профилирование запросов (включается переменной YATUBE_PROFILING=1).
+
+Для каждого запроса считаются число и время SQL (через
+yatube.querywrappers, с учётом потоков пула), собственное время рендера
+каждого шаблона (без вложенных include) и имя представления. Сводка уходит
+в заголовок Server-Timing, а часть запросов (PROFILING_SAMPLE_RATE)
+пишется JSON-строкой в логгер ``yatube.profiling``; её разбирает команда
+``profile_report``.
+"""
+import json
+import logging
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.template.base import Template
+
+from .querywrappers import wrap_queries
+
+logger = logging.getLogger('yatube.profiling')
+
+TOP_TEMPLATES = 5
+
+_current = ContextVar('yatube_profile', default=None)
+_original_render = Template.render
+
+
+class Profile:
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.templates = {}
+        self.stack = []
+        self.lock = threading.Lock()
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self.lock:
+                self.sql_count += 1
+                self.sql_time += elapsed
+
+    def template_started(self):
+        self.stack.append(0.0)
+
+    def template_finished(self, name, elapsed):
+        children = self.stack.pop()
+        if self.stack:
+            self.stack[-1] += elapsed
+        count, total = self.templates.get(name, (0, 0.0))
+        self.templates[name] = (count + 1, total + elapsed - children)
+
+
+def _timed_render(self, context):
+    profile = _current.get()
+    if profile is None:
+        return _original_render(self, context)
+    profile.template_started()
+    started = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        profile.template_finished(self.name or '<string>',
+                                  time.perf_counter() - started)
+
+
+def _metric(name):
+    return re.sub(r'[^A-Za-z0-9_.-]', '-', name)
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not settings.PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        Template.render = _timed_render
+
+    def __call__(self, request):
+        profile = Profile()
+        token = _current.set(profile)
+        started = time.perf_counter()
+        try:
+            with wrap_queries(profile.execute):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else None
+        templates = sorted(profile.templates.items(),
+                           key=lambda item: item[1][1], reverse=True)
+        timings = [
+            f'total;dur={total * 1000:.1f}',
+            f'db;dur={profile.sql_time * 1000:.1f};'
+            f'desc="{profile.sql_count} queries"',
+            *(f'tpl-{_metric(name)};dur={elapsed * 1000:.1f}'
+              for name, (_, elapsed) in templates[:TOP_TEMPLATES]),
+        ]
+        response['Server-Timing'] = ', '.join(timings)
+        if random.random() < settings.PROFILING_SAMPLE_RATE:
+            logger.info(json.dumps({
+                'time': time.time(),
+                'method': request.method,
+                'path': request.path,
+                'view': view,
+                'status': response.status_code,
+                'total_ms': round(total * 1000, 3),
+                'sql_count': profile.sql_count,
+                'sql_ms': round(profile.sql_time * 1000, 3),
+                'templates': {
+                    name: {'count': count, 'ms': round(elapsed * 1000, 3)}
+                    for name, (count, elapsed) in templates
+                },
+            }, ensure_ascii=False))
+        return response
@@ -0,0 +1,39 @@
+"""Обёртки SQL-запросов на время HTTP-запроса, в том числе в потоках пула.
+
+connection.execute_wrapper действует только на соединение текущего
+потока. wrap_queries ставит обёртку на соединения потока и запоминает её в
+контекстной переменной; installed_wrappers ставит все запомненные обёртки
+на соединения другого потока, которому передан контекст
+(см. posts.concurrent). Так метрики и профилирование видят и запросы,
+выполненные параллельно.
+"""
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+
+_active = ContextVar('yatube_query_wrappers', default=())
+
+
+@contextmanager
+def _installed(wrappers):
+    with ExitStack() as stack:
+        for connection in connections.all():
+            for wrapper in wrappers:
+                stack.enter_context(connection.execute_wrapper(wrapper))
+        yield
+
+
+@contextmanager
+def wrap_queries(wrapper):
+    token = _active.set((*_active.get(), wrapper))
+    try:
+        with _installed((wrapper,)):
+            yield
+    finally:
+        _active.reset(token)
+
+
+def installed_wrappers():
+    """Поставить активные обёртки на соединения текущего потока."""
+    return _installed(_active.get())
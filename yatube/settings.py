@@ -1,4 +1,7 @@
 import os
+import sys
+
+from django.core.exceptions import ImproperlyConfigured
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = 'n)qhpxt*n5)ouy05lep_wagg==8tyj6q4#wa_xob)@cpvutj_u'
@@ -21,7 +24,7 @@ ALLOWED_HOSTS = [
 INSTALLED_APPS = [
     'about',
     'users',
-    'posts',
+    'posts.apps.PostsConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -32,8 +35,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yatube.profiling.ProfilingMiddleware',
+    'yatube.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'posts.replicas.StickyWritesMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -62,13 +68,52 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# SQLite для нескольких воркеров gunicorn (см. yatube.sqlite): WAL,
+# ожидание блокировки вместо ошибки и постоянные соединения.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'yatube.sqlite',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.environ.get('YATUBE_DB_CONN_MAX_AGE', 60)),
+        'TRANSACTION_MODE': os.environ.get('YATUBE_SQLITE_TRANSACTION_MODE',
+                                           'IMMEDIATE'),
+        'PRAGMAS': {
+            'journal_mode': os.environ.get('YATUBE_SQLITE_JOURNAL_MODE',
+                                           'wal'),
+            'synchronous': os.environ.get('YATUBE_SQLITE_SYNCHRONOUS',
+                                          'normal'),
+            'busy_timeout': int(
+                os.environ.get('YATUBE_SQLITE_BUSY_TIMEOUT', 5000)),
+            'mmap_size': int(
+                os.environ.get('YATUBE_SQLITE_MMAP_SIZE', 256 * 1024 ** 2)),
+            # Отрицательное значение — размер в килобайтах.
+            'cache_size': int(
+                os.environ.get('YATUBE_SQLITE_CACHE_SIZE', -64 * 1024)),
+        },
     }
 }
 
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+
+# Реплики для чтения страниц ленты (см. posts.replicas): пути к файлам
+# SQLite через запятую. Локально их заполняет команда sync_replicas.
+# В тестах переменная не действует: тесты реплик настраивают свою.
+DATABASE_REPLICAS = []
+_replica_paths = '' if TESTING else os.environ.get('YATUBE_DB_REPLICAS', '')
+for _path in filter(None, _replica_paths.split(',')):
+    DATABASE_REPLICAS.append(f'replica{len(DATABASE_REPLICAS) + 1}')
+    DATABASES[DATABASE_REPLICAS[-1]] = {
+        **DATABASES['default'],
+        'NAME': _path.strip(),
+    }
+DATABASE_ROUTERS = ['posts.replicas.ReplicaRouter']
+REPLICA_STICKY_SECONDS = float(
+    os.environ.get('YATUBE_REPLICA_STICKY_SECONDS', 5))
+# Сколько живут в кешах страницы, собранные с реплики: столько же
+# остальные читатели могут видеть её отставание.
+REPLICA_CACHE_SECONDS = float(
+    os.environ.get('YATUBE_REPLICA_CACHE_SECONDS', 5))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -84,10 +129,54 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Кеш выбирается переменной окружения YATUBE_CACHE. Для нескольких
+# воркеров gunicorn нужен общий бэкенд: file, db (таблица из
+# createcachetable) или redis (требует пакет django-redis). Фрагменты
+# страниц хранятся по версиям и вариантам зрителя, поэтому file и db
+# держат до YATUBE_CACHE_MAX_ENTRIES записей вместо 300 по умолчанию.
+CACHE_MAX_ENTRIES = int(os.environ.get('YATUBE_CACHE_MAX_ENTRIES', 50000))
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+        'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'yatube_cache',
+        'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+    },
+    'redis': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:6379/1',
+    },
+}
+CACHE_BACKEND = os.environ.get('YATUBE_CACHE', 'locmem')
+if CACHE_BACKEND not in CACHE_BACKENDS:
+    raise ImproperlyConfigured(
+        f'Неизвестный YATUBE_CACHE={CACHE_BACKEND!r}, '
+        f'допустимы: {", ".join(CACHE_BACKENDS)}')
+CACHE_CONFIG = dict(CACHE_BACKENDS[CACHE_BACKEND])
+if os.environ.get('YATUBE_CACHE_LOCATION'):
+    CACHE_CONFIG['LOCATION'] = os.environ['YATUBE_CACHE_LOCATION']
+
+# Версия схемы кеша приложения posts: её увеличивают, когда меняется
+# разметка закешированных фрагментов, чтобы не отдавать старый HTML.
+POSTS_CACHE_VERSION = int(os.environ.get('YATUBE_POSTS_CACHE_VERSION', 1))
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        **CACHE_CONFIG,
+        'KEY_PREFIX': 'yatube',
+    },
+    'posts': {
+        **CACHE_CONFIG,
+        'KEY_PREFIX': 'yatube:posts',
+        'VERSION': POSTS_CACHE_VERSION,
+    },
 }
 
 LANGUAGE_CODE = 'ru'
@@ -107,3 +196,62 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Профилирование запросов: Server-Timing и выборочный JSON-лог для
+# команды profile_report. По умолчанию выключено.
+PROFILING = os.environ.get('YATUBE_PROFILING') == '1'
+PROFILING_SAMPLE_RATE = float(os.environ.get('YATUBE_PROFILING_SAMPLE', 0.1))
+PROFILING_LOG = os.environ.get('YATUBE_PROFILING_LOG',
+                               os.path.join(BASE_DIR, 'profile.log'))
+
+# Независимые запросы страницы post_view в пуле
+# потоков (см. posts.concurrent). По умолчанию выключено.
+CONCURRENT_READS = os.environ.get('YATUBE_CONCURRENT_READS') == '1'
+
+# Потоки фоновой подготовки миниатюр (см. posts.thumbnails); при 0
+# миниатюры готовятся сразу после сохранения записи. В тестах воркер
+# выключен: его запись в базу спорит с транзакциями тестов.
+THUMBNAIL_WORKERS = 0 if TESTING else int(
+    os.environ.get('YATUBE_THUMBNAIL_WORKERS', 2))
+
+# Пакетная запись комментариев и подписок фоновым потоком
+# (см. posts.writes). По умолчанию выключено.
+WRITE_BATCHING = os.environ.get('YATUBE_WRITE_BATCHING') == '1'
+
+# Метрики в формате Prometheus на /metrics. По умолчанию выключено.
+# Страница доступна адресам из YATUBE_METRICS_ALLOWED_IPS или по
+# заголовку «Authorization: Bearer <YATUBE_METRICS_TOKEN>». Под gunicorn
+# с несколькими воркерами задайте общий каталог YATUBE_METRICS_DIR.
+METRICS = os.environ.get('YATUBE_METRICS') == '1'
+METRICS_TOKEN = os.environ.get('YATUBE_METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = os.environ.get(
+    'YATUBE_METRICS_ALLOWED_IPS', '127.0.0.1').split(',')
+METRICS_DIR = os.environ.get('YATUBE_METRICS_DIR') or None
+METRICS_FLUSH_INTERVAL = float(
+    os.environ.get('YATUBE_METRICS_FLUSH_INTERVAL', 1))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {},
+    'loggers': {
+        'yatube.profiling': {
+            'handlers': [],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# Файл лога создаётся только при включённом профилировании.
+if PROFILING:
+    LOGGING['handlers']['profiling'] = {
+        'class': 'logging.FileHandler',
+        'filename': PROFILING_LOG,
+        'formatter': 'message',
+        'delay': True,
+    }
+    LOGGING['loggers']['yatube.profiling']['handlers'] = ['profiling']
@@ -0,0 +1,10 @@
+"""SQLite с настройками для нескольких воркеров (ENGINE 'yatube.sqlite').
+
+Каждое новое соединение получает PRAGMA из ключа PRAGMAS настроек базы
+(WAL, synchronous, mmap_size, cache_size, busy_timeout), а транзакции
+transaction.atomic() открываются через BEGIN IMMEDIATE, если задан
+TRANSACTION_MODE='IMMEDIATE'. В WAL читатели не мешают писателю, но
+отложенная транзакция, которая сначала читает, а потом пишет, получает
+``database is locked`` сразу, не дожидаясь busy_timeout: блокировка на
+запись берётся в начале транзакции, чтобы ожидание работало.
+"""
@@ -0,0 +1,35 @@
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+PRAGMA_VALUE = re.compile(r'^-?\w+$')
+# journal_mode хранится в файле базы, у базы в памяти его не поменять.
+PERSISTENT_PRAGMAS = ('journal_mode',)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def pragmas(self):
+        pragmas = self.settings_dict.get('PRAGMAS') or {}
+        for name, value in pragmas.items():
+            if not PRAGMA_VALUE.match(name) or not PRAGMA_VALUE.match(
+                    str(value)):
+                raise ImproperlyConfigured(
+                    f'Недопустимая PRAGMA SQLite: {name}={value!r}')
+        if self.is_in_memory_db():
+            return {name: value for name, value in pragmas.items()
+                    if name not in PERSISTENT_PRAGMAS}
+        return pragmas
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas().items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict.get('TRANSACTION_MODE') or ''
+        if mode.upper() not in ('', 'DEFERRED', 'IMMEDIATE', 'EXCLUSIVE'):
+            raise ImproperlyConfigured(
+                f'Недопустимый TRANSACTION_MODE SQLite: {mode!r}')
+        self.cursor().execute(f'BEGIN {mode}'.strip())
@@ -4,6 +4,8 @@ from django.conf.urls import handler404, handler500
 from django.conf import settings
 from django.conf.urls.static import static
 
+from yatube.metrics import metrics_view
+
 
 handler404 = 'posts.views.page_not_found'  # noqa
 handler500 = 'posts.views.server_error'  # noqa
@@ -13,6 +15,8 @@ urlpatterns = [
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('admin/', admin.site.urls),
+    path('api/v1/', include('posts.api_urls', namespace='api')),
+    path('metrics', metrics_view, name='metrics'),
     path('', include('posts.urls')),
     path('about/', include('about.urls', namespace='about')),
 ]